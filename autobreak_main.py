@@ -1,31 +1,28 @@
 import argparse
 import csv
 import glob
+import heapq
+import json
 
 # import logging
+import multiprocessing
 import os
 import random
 import sys
+import time
 import traceback
 from shutil import copyfile
 
-import openpyxl
-import pandas as pd
 import numpy as np
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-import svgutils as su
-import matplotlib.cm as cm
-import matplotlib.pyplot as plt
-import numpy as np
-import matplotlib.colors
-
-from cn2svg import cn2svg
-from tqdm import tqdm
 
 # from . import origamidesign, scaffolds, utilities
 from origamidesign import Origami
+from breakgraph import BreakGraph
+from profiler import PhaseProfiler
+from resultcache import ResultCache
+from resultswriter import ResultsWriter
 import scaffolds
+import tracing
 import utilities
 
 
@@ -35,12 +32,26 @@ import os
 log_dir = os.path.dirname(os.path.abspath(__file__))
 log_file = os.path.join(log_dir, "autobreak_main.log")
 
-logging.basicConfig(
-    filename=log_file,
-    level=logging.DEBUG,
-    format="%(asctime)s %(levelname)s: %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+# AutoBreak object shared with the forked worker processes
+WORKER_AUTOBREAK = None
+
+# Output artifacts selectable with --outputs
+OUTPUT_TYPES = ["json", "summary", "excel", "plots", "heatmap", "zip"]
+
+# Outputs that are made from other outputs
+OUTPUT_DEPENDENCIES = {
+    "heatmap": ["json"],
+    "summary": ["heatmap", "plots"],
+}
+
+# Oligo group solvers
+GROUP_SOLVERS = ["stepwise", "exact"]
+
+# Staple columns of the results plots
+PLOT_COLUMNS = ["Tf", "TfColor", "dGhyb", "dGloop"]
+
+# Outputs that can be rendered from a saved result file
+RENDER_OUTPUTS = ["heatmap", "plots", "summary", "zip"]
 
 class OligoBreakSolution:
     """
@@ -56,7 +67,6 @@ class OligoBreakSolution:
         self.breaks = None  # This stores the breaking points of the staple
         self.edges = None  # This stores the edges [connection ] between the breaks
         self.dsDNA_length = 0  # This stores the double-stranded DNA length
-        logging.debug("OligoBreakSolution initialized")
 
     def get_csv_rows(self):
         """
@@ -92,7 +102,6 @@ class OligoBreakSolution:
         csv_writer_rows = []
         for edge in self.edges[:-1]:
             csv_writer_rows.append(edge.get_csv_row_object())
-        logging.debug(f"Calculated dsDNA length: {self.dsDNA_length}")
         return csv_writer_rows
 
     def calculate_dsDNA_length(self):
@@ -105,7 +114,7 @@ class OligoBreakSolution:
         for edge in self.edges:
             if edge is not None:
                 self.dsDNA_length += sum(edge.dsDNA_length_list)
-        logging.info(f"dsDNA length: {self.dsDNA_length}")
+        tracing.debug("dsDNA length: %s", self.dsDNA_length)
         return self.dsDNA_length
 
     def break_oligo_solution(self):
@@ -117,7 +126,7 @@ class OligoBreakSolution:
         """
         for current_break in self.breaks[:-1]:
             current_break.break_cadnano()
-            logging.info(f"Breaking oligo solution at break point {current_break.key}")
+            tracing.debug("Breaking oligo solution at break point %s", current_break.key)
 
     def apply_temp_neighbor_constraints(self):
         """
@@ -133,9 +142,12 @@ class OligoBreakSolution:
             if new_break.neighbor_break:
                 neighbor_break = new_break.neighbor_break
                 neighbor_break.dont_break_temp = True
-                logging.info(
-                    f"Applied temp neighbor constraint to break point {neighbor_break.key}"
-                )
+                if tracing.DEBUG <= tracing.LEVEL:
+                    tracing.trace(
+                        tracing.DEBUG,
+                        "Applied temp neighbor constraint to break point %s",
+                        neighbor_break.key,
+                    )
 
     def print_solution(self):
         """Print break solution"""
@@ -156,9 +168,12 @@ class OligoBreakSolution:
             if new_break.neighbor_break:
                 neighbor_break = new_break.neighbor_break
                 neighbor_break.dont_break_temp = False
-                logging.info(
-                    f"Reset temp neighbor constraint at break point {neighbor_break.key}"
-                )
+                if tracing.DEBUG <= tracing.LEVEL:
+                    tracing.trace(
+                        tracing.DEBUG,
+                        "Reset temp neighbor constraint at break point %s",
+                        neighbor_break.key,
+                    )
 
     def calculate_self_penalty(self):
         """
@@ -199,7 +214,19 @@ class OligoBreakSolution:
 
         self.edges = [break_path.break_edge for break_path in self.break_paths[::-1]]
         self.scores = [break_path.score for break_path in self.break_paths[::-1]]
-        logging.info(f"Initialized with breaks: {self.breaks} and edges: {self.edges}")
+        tracing.debug("Initialized with breaks: %s and edges: %s", self.breaks, self.edges)
+
+    def to_record(self):
+        """
+        Return a compact record of the solution, the breaks are stored as indices
+        into the oligo break list so the solution can be rebuilt in another process
+        """
+        oligo_breaks = self.breaks[0].oligo.breaks
+        return {
+            "breaks": [oligo_breaks.index(new_break) for new_break in self.breaks],
+            "scores": list(self.scores),
+            "score": self.score,
+        }
 
     def is_identical(self, other_solution, max_index=None):
         """
@@ -229,7 +256,7 @@ class OligoBreakSolution:
         # Pairwise comparison of elements
         for i in range(max_i):
             identical *= current_breaks[i] == other_breaks[i]
-        logging.info(f"Solution identical: {identical}")
+        tracing.debug("Solution identical: %s", identical)
 
         return identical
 
@@ -261,6 +288,13 @@ class GroupBreaksolution:
 
         return csv_writer_rows
 
+    def to_record(self):
+        """Return a compact record of the group solution"""
+        return {
+            key: break_solution.to_record() if break_solution else None
+            for key, break_solution in self.break_solutions.items()
+        }
+
     def break_group_solution(self):
         """Break group solution"""
         for key in self.break_solutions:
@@ -282,17 +316,27 @@ class GroupBreaksolution:
                 self.total_score,
                 self.total_penalty,
             )
-            logging.info(summary)
+            tracing.info(summary)
             # Print the solutions
             for oligo_key in self.break_solutions:
                 # Print solution for oligo
                 solution = "Solution for oligo: (%d,%d,%d)" % oligo_key
-                logging.info(solution)
+                tracing.info(solution)
                 if self.break_solutions[oligo_key]:
                     self.break_solutions[oligo_key].print_solution()
 
     def calculate_penalty(self, verbose=False):
         """Calculate penalty for the oligo group solution"""
+        # Calculate the penalty on the break graph arrays if the breaks are in the graph
+        break_graph = self.origami.break_graph if self.origami else None
+        if break_graph is not None and all(
+            break_graph.has_break(break_solution.breaks[0])
+            for break_solution in self.break_solutions.values()
+            if break_solution
+        ):
+            break_graph.calculate_penalty(self)
+            return
+
         self.total_score = 0
         self.total_penalty = 0
         self.total_dsDNA_length = 0
@@ -464,10 +508,20 @@ class CompleteBreakSolution:
 
         # Determine normalized score
         self.total_norm_score = 1.0 * self.total_score / self.total_dsDNA_length
-        logging.info(
-            f"Total score: {self.total_score}, Norm score: {self.total_norm_score}"
+        tracing.debug(
+            "Total score: %s, Norm score: %s", self.total_score, self.total_norm_score
         )
 
+    def to_record(self):
+        """Return a compact record of the complete solution"""
+        return {
+            "sequence_offset": self.sequence_offset,
+            "group_solutions": {
+                key: group_solution.to_record() if group_solution else None
+                for key, group_solution in self.group_solutions.items()
+            },
+        }
+
     def get_csv_rows(self):
         """Get csv writer rows"""
         csv_writer_rows = []
@@ -490,11 +544,13 @@ class CompleteBreakSolution:
             ["SequenceOffset", self.sequence_offset],
             ["CorrectedOffset", self.corrected_offset],
         ]
-        logging.info(f"Summary rows: {summary_rows}")
+        tracing.debug("Summary rows: %s", summary_rows)
         return summary_rows
 
-    def export_staples(self, filename):
-        """Export the staples and its scores into an excel file"""
+    def export_staples(self, results_writer):
+        """Export the staples and its scores to a sheet of the results writer"""
+        import pandas as pd  # Deferred import
+
         # Get summary rows
         summary_rows = np.array(self.get_summary_rows())
 
@@ -505,36 +561,20 @@ class CompleteBreakSolution:
         if len(summary_rows) == 0 or len(csv_rows) == 0:
             return
 
-        # Write to `filename` workbook
-        with pd.ExcelWriter(
-            filename, engine="openpyxl", mode="a", if_sheet_exists="overlay"
-        ) as writer:
-
-            # Assign sheet number
-            sheet_number = self.sequence_offset
-
-            # Create data frames
-            self.summary_frame = pd.DataFrame(summary_rows)
-
-            # Create staples frames
-            self.staples_frame = pd.DataFrame(csv_rows, columns=self.csv_header)
-
-            # Write summary data
-            self.summary_frame.to_excel(
-                writer, sheet_name=str(sheet_number), header=None, index=False
-            )
+        # Create data frames
+        self.summary_frame = pd.DataFrame(summary_rows)
 
-            # Write staples data
-            self.staples_frame.to_excel(
-                writer,
-                sheet_name=str(sheet_number),
-                header=self.csv_header,
-                index=False,
-                startrow=10,
-            )
-        logging.info(f"Exported staples to file: {filename}")
-        # Save and close
-        # writer.close()
+        # Create staples frames
+        self.staples_frame = pd.DataFrame(csv_rows, columns=self.csv_header)
+
+        # Append the sheet of the sequence offset
+        results_writer.write_offset_sheet(
+            str(self.sequence_offset),
+            summary_rows.tolist(),
+            self.csv_header,
+            csv_rows.tolist(),
+        )
+        tracing.info("Exported staples of offset %s", self.sequence_offset)
 
 
 class AutoStaple:
@@ -662,9 +702,44 @@ class AutoBreak:
         # Permutation parameter
         self.permute_sequence = False
 
+        # Random seed, reapplied for every sequence offset
+        self.random_seed = 0
+
+        # Number of worker processes for the sequence offset sweep
+        self.num_jobs = 1
+
+        # Compact break graph parameter
+        self.compact_graph = False
+
+        # Oligo group solver, the time budget per oligo group in seconds and the
+        # number of candidate paths per oligo of the exact solver
+        self.group_solver = "stepwise"
+        self.group_time_budget = 1.0
+        self.group_num_candidates = 10
+
+        # Length window (lower, upper) of the break edge superset
+        self.edge_window = None
+
+        # On-disk result cache and the content hash of the design files
+        self.result_cache = None
+        self.design_hash = None
+
+        # Output artifacts to write
+        self.outputs = set(OUTPUT_TYPES)
+
+        # Result file the outputs can be rendered from
+        self.result_file = None
+
         # Excel file that stores the results
         self.results_excel_file = None
 
+        # Results writer and the prefix of its sequence offset stream files
+        self.results_writer = None
+        self.results_stream_prefix = None
+
+        # Heatmap cell styles, keyed by hex color
+        self.color_styles = {}
+
         # csv versions of the output files
         self.autobreak_csv_file = None
         self.summary_csv_file = None
@@ -775,6 +850,7 @@ class AutoBreak:
 
     def write_results_summary(self):
         """Write results summary"""
+        import pandas as pd  # Deferred import
 
         # Get results summary
         results_summary = np.array(self.get_results_summary())
@@ -783,19 +859,6 @@ class AutoBreak:
         if len(results_summary) == 0:
             sys.exit("SOLUTION DOESNT EXIST")
 
-        # Create writer
-        if os.path.exists(self.results_excel_file):
-            writer = pd.ExcelWriter(
-                self.results_excel_file,
-                engine="openpyxl",
-                mode="a",
-                if_sheet_exists="overlay",
-            )
-        else:
-            writer = pd.ExcelWriter(
-                self.results_excel_file, engine="openpyxl", mode="w"
-            )
-
         # Create data frames
         self.summary_frame = pd.DataFrame(results_summary)
 
@@ -810,31 +873,55 @@ class AutoBreak:
         ]
 
         # Write summary data
-        self.summary_frame.to_excel(
-            writer, sheet_name="Summary", header=self.summary_header, index=False
-        )
-
-        # Save writer and close
-        writer.close()
+        if self.has_output("excel"):
+            self.get_results_writer().write_rows(
+                "Summary",
+                self.summary_frame.values.tolist(),
+                header=self.summary_header,
+            )
 
     def write_results(self, sequence_offset=0):
         """Write Solution results to a sheet in results excel file"""
-        if sequence_offset in self.complete_solutions:
+        if self.has_output("excel") and sequence_offset in self.complete_solutions:
             self.complete_solutions[sequence_offset].export_staples(
-                self.results_excel_file
+                self.get_results_writer()
             )
 
     def write_best_result(self):
         """Write best result"""
-        if not self.write_all_results:
-            self.best_complete_solution.export_staples(self.results_excel_file)
+        if self.has_output("excel") and not self.write_all_results:
+            self.best_complete_solution.export_staples(self.get_results_writer())
 
     def create_results_excel_file(self):
-        """Create resuls excel file"""
-        wb = openpyxl.Workbook()
-        sheet = wb.active
-        sheet.title = "Summary"
-        wb.save(self.results_excel_file)
+        """Create the results writer, the sequence offset sheets are streamed to csv"""
+        self.results_writer = ResultsWriter(
+            self.results_excel_file,
+            self.results_stream_prefix,
+            color_column="TfColor",
+            color_style=self.get_color_style,
+        )
+
+    def get_results_writer(self):
+        """Get the results writer, create it on first use"""
+        if self.results_writer is None:
+            self.create_results_excel_file()
+        return self.results_writer
+
+    def close_results_excel_file(self):
+        """Build the results excel file, the heatmap colors are applied while writing"""
+        if self.results_writer is None:
+            return
+
+        self.results_writer.close()
+        self.results_writer = None
+
+    def set_outputs(self, outputs=None):
+        """Set the output artifacts to write, all of them by default"""
+        self.outputs = set(OUTPUT_TYPES) if outputs is None else set(outputs)
+
+    def has_output(self, output):
+        """Check if an output artifact is written"""
+        return output in self.outputs
 
     def set_lower_bound(self, min_length=21):
         """Set lower bound"""
@@ -861,6 +948,26 @@ class AutoBreak:
         """Set permute sequence"""
         self.permute_sequence = permute
 
+    def set_random_seed(self, seed=0):
+        """Set random seed"""
+        self.random_seed = seed
+
+    def set_compact_graph(self, compact=False):
+        """Set compact break graph parameter"""
+        self.compact_graph = compact
+
+    def set_result_cache(self, result_cache=None):
+        """Set on-disk result cache"""
+        self.result_cache = result_cache
+
+    def set_num_jobs(self, num_jobs=1):
+        """Set number of worker processes"""
+        self.num_jobs = max(1, num_jobs)
+
+    def seed_sequence_offset(self, offset):
+        """Seed the random generator for a sequence offset"""
+        random.seed("%s.%s" % (self.random_seed, offset))
+
     def color_oligos_by_folding_prob(self):
         """Color oligos by folding prob"""
         for oligo in self.origami.oligos["staple"]:
@@ -976,6 +1083,8 @@ class AutoBreak:
 
     def create_staple_heatmap(self, is_notebook_session):
         """Generate Cadnano schematic in SVG format using cn2svg"""
+        from cn2svg import cn2svg  # Deferred import
+
         svg_args = cn2svg.DefaultArgs()
         svg_args.input = self.json_legacy_output  # Cadnano json file
         svg_args.output = self.results_heatmap_dir  # Output directory
@@ -987,16 +1096,14 @@ class AutoBreak:
 
     def create_results_plots(self):
         """Generate Staple Results plot in SVG format using matplotlib"""
+        import matplotlib as mpl  # Deferred import
+        import matplotlib.pyplot as plt  # Deferred import
 
-        if not os.path.exists(self.results_excel_file):
+        if self.staples_frame is None:
             return
 
-        # Read specific columns from the file
-        df = pd.read_excel(
-            self.results_excel_file,
-            sheet_name="Final",
-            usecols=["Tf", "TfColor", "dGhyb", "dGloop"],
-        )
+        # Plot the staples of the final solution
+        df = self.staples_frame[PLOT_COLUMNS]
 
         # print("<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>><<<<<<<<<<<<<<<<<<<\n\n\n")
         # print(self.results_excel_file)
@@ -1126,6 +1233,7 @@ class AutoBreak:
 
     def create_summary_figure(self):
         """Compose Cadnano schematic and Results plots using svgutils"""
+        import svgutils as su  # Deferred import
 
         # Load SVG files as svgutils.transform.SVGFigure objects to get dimensions
         svg_A = su.transform.fromfile(self.results_heatmap_path)
@@ -1190,6 +1298,7 @@ class AutoBreak:
             └── {name}_{run}_autobreak.json  # Break solution applied
             └── {name}_{run}_report.svg      # Composite of heatmap and plots
             └── {name}_{run}_results.xlsx    # Per-staple model calculations
+            └── {name}_{run}_result.json     # Result file, see --render
         """
 
         # Get the current working directory
@@ -1214,9 +1323,9 @@ class AutoBreak:
         self.output_name = name = "%s_%04d" % (root, self.output_counter)
         print("Run name:", "%s_autobreak_%04d" % (root, self.output_counter))
 
-        outdir = self.output_directory
-
-        self.autobreak_log = os.path.join(outdir, "intermediates", name + ".log")
+        self.autobreak_log = os.path.join(
+            self.output_directory, "intermediates", name + ".log"
+        )
 
         # Redirect stderr to logger
         class StdErrLogger(object):
@@ -1231,6 +1340,13 @@ class AutoBreak:
 
         sys.stderr = StdErrLogger()
 
+        self.set_output_paths(name)
+
+    def set_output_paths(self, name):
+        """Set the output file paths of a run name in the output directory"""
+        self.output_name = name
+        outdir = self.output_directory
+
         # Output file paths
         self.json_legacy_output = os.path.join(
             outdir, "outputs", name + "_autobreak.json"
@@ -1238,6 +1354,9 @@ class AutoBreak:
         self.results_excel_file = os.path.join(
             outdir, "outputs", name + "_results.xlsx"
         )
+        self.results_stream_prefix = os.path.join(
+            outdir, "intermediates", name + "_offsets"
+        )
         self.results_heatmap_dir = os.path.join(outdir, "intermediates")
         self.results_heatmap_path = os.path.join(
             outdir, "intermediates", name + "_autobreak_path.svg"
@@ -1247,6 +1366,7 @@ class AutoBreak:
         )
         self.results_plots = os.path.join(outdir, "intermediates", name + "_plots.svg")
         self.results_report = os.path.join(outdir, "outputs", name + "_report.svg")
+        self.result_file = os.path.join(outdir, "outputs", name + "_result.json")
 
         # Optional CSV output paths, enabled with `-csv` flag
         self.autobreak_csv_file = os.path.join(
@@ -1257,6 +1377,69 @@ class AutoBreak:
         # Zip archive
         self.zip_archive_file = f"{outdir}.zip"
 
+    def write_result_file(self):
+        """Write the result file the outputs can be rendered from later"""
+        result = {
+            "name": self.output_name,
+            "input": self.input_tail,
+            "outputs": [output for output in OUTPUT_TYPES if self.has_output(output)],
+            "seq_filename": None,
+            "sequence_offset": None,
+            "corrected_offset": None,
+            "total_score": None,
+            "gibbs_free_energy": None,
+            "staples": None,
+        }
+
+        # Keep the paths relative, so the output directory can be moved
+        if self.seq_filename:
+            result["seq_filename"] = os.path.relpath(
+                self.seq_filename, self.output_directory
+            )
+
+        # Keep the plotted staple columns, so the plots can be rendered again
+        if self.staples_frame is not None:
+            result["staples"] = self.staples_frame[PLOT_COLUMNS].to_dict(
+                orient="list"
+            )
+
+        best_complete_solution = self.best_complete_solution
+        if best_complete_solution:
+            result["sequence_offset"] = int(best_complete_solution.sequence_offset)
+            result["corrected_offset"] = int(best_complete_solution.corrected_offset)
+            result["total_score"] = float(best_complete_solution.total_score)
+            result["gibbs_free_energy"] = float(
+                best_complete_solution.calculate_gibbs_free_energy()
+            )
+
+        with open(self.result_file, "w") as result_file:
+            json.dump(result, result_file, indent=2, default=lambda value: value.item())
+
+    def load_result_file(self, result_filename):
+        """Load a result file and set the output paths of its run"""
+        import pandas as pd  # Deferred import
+
+        with open(result_filename) as result_file:
+            result = json.load(result_file)
+
+        # The result file is in the outputs folder of the run
+        self.output_directory = os.path.dirname(
+            os.path.dirname(os.path.abspath(result_filename))
+        )
+        self.input_tail = result["input"]
+        self.set_output_paths(result["name"])
+
+        if result["seq_filename"]:
+            self.seq_filename = os.path.join(
+                self.output_directory, result["seq_filename"]
+            )
+
+        # Get the plotted staple columns
+        if result["staples"]:
+            self.staples_frame = pd.DataFrame(result["staples"])
+
+        return result
+
     def zip_results(self):
         """Compresses the contents of the run directory into a zip file."""
         utilities.zip_directory(self.output_directory, self.zip_archive_file)
@@ -1291,6 +1474,16 @@ class AutoBreak:
         self.NUM_OLIGO_SOLUTIONS = solutions_per_oligo
         self.NUM_GLOBAL_SOLUTIONS = global_solutions
 
+    def set_group_solver(self, group_solver="stepwise", time_budget=1.0):
+        """Set the oligo group solver and its time budget per oligo group"""
+        if group_solver not in GROUP_SOLVERS:
+            raise ValueError(
+                "Unknown group solver %s, choose from %s"
+                % (group_solver, ", ".join(GROUP_SOLVERS))
+            )
+        self.group_solver = group_solver
+        self.group_time_budget = time_budget
+
     def set_k_select(self, k_parameter="best"):
         """Set k-select value"""
         self.k_select = k_parameter
@@ -1322,8 +1515,8 @@ class AutoBreak:
             # Update graph edge weights
             self.update_edge_weights()
 
-    def permute_scaffold_sequence_autobreak(self, nitr=100):
-        """Permute scaffold sequence"""
+    def get_permutation_offsets(self, nitr=100):
+        """Get the sequence offsets for the permutation loop"""
         # Set start offset
         start_offset = self.origami.sequence_offset
 
@@ -1334,20 +1527,255 @@ class AutoBreak:
             # Check the number of permutation iterations allowed
             if nitr < final_itr:
                 final_itr = nitr
-        for itr in tqdm(range(0, final_itr), desc="Permutation loop"):
-            # Set the current offset
-            current_offset = (start_offset + itr) % self.origami.scaffolds[0].length()
 
-            # Shift the sequence to the offset
-            self.shift_scaffold_sequence(current_offset)
+        return [
+            (start_offset + itr) % self.origami.scaffolds[0].length()
+            for itr in range(0, final_itr)
+        ]
+
+    def permute_scaffold_sequence_autobreak(self, nitr=100):
+        """Permute scaffold sequence"""
+        from tqdm import tqdm  # Deferred import
+
+        # Get the sequence offsets
+        offsets = self.get_permutation_offsets(nitr)
+
+        # Distribute the offsets over worker processes
+        if self.use_workers(len(offsets)):
+            self.permute_scaffold_sequence_parallel(offsets)
+            return
 
-            # Run autobreak
-            self.run_autobreak()
+        for current_offset in tqdm(offsets, desc="Permutation loop"):
+            # Run autobreak for the offset
+            self.solve_sequence_offset(current_offset)
 
             # Write results
             if self.write_all_results:
                 self.write_results(current_offset)
 
+    def permute_scaffold_sequence_parallel(self, offsets):
+        """
+        Solve the sequence offsets in forked worker processes
+
+        Each worker inherits the prepared origami graph and returns compact solution
+        records which are rebuilt on the graph of the parent process.
+        """
+        records = self.map_workers(
+            solve_sequence_offset_worker, offsets, desc="Permutation loop"
+        )
+
+        # Merge the solutions
+        for record in records:
+            if record:
+                complete_solution = self.complete_solution_from_record(record)
+                self.complete_solutions[complete_solution.sequence_offset] = (
+                    complete_solution
+                )
+
+        # Write results, the edges are updated for each offset before writing
+        if self.write_all_results:
+            for current_offset in offsets:
+                self.shift_scaffold_sequence(current_offset)
+                self.write_results(current_offset)
+
+        # Leave the design at the last offset as in the serial loop
+        if self.origami.sequence_offset != offsets[-1]:
+            self.shift_scaffold_sequence(offsets[-1])
+
+    def use_workers(self, num_tasks):
+        """Determine if the tasks should be distributed over worker processes"""
+        return (
+            self.num_jobs > 1
+            and num_tasks > 1
+            and "fork" in multiprocessing.get_all_start_methods()
+            and not multiprocessing.current_process().daemon
+        )
+
+    def map_workers(self, worker_func, tasks, desc=None):
+        """
+        Map the tasks over forked worker processes and return the results in order
+
+        The workers inherit the current state of the autobreak object, including the
+        origami graph and the edge weights for the current sequence offset.
+        """
+        global WORKER_AUTOBREAK
+
+        # Share the prepared autobreak object with the forked workers
+        WORKER_AUTOBREAK = self
+        num_jobs = min(self.num_jobs, len(tasks))
+        chunk_size = max(1, len(tasks) // (4 * num_jobs))
+        context = multiprocessing.get_context("fork")
+
+        try:
+            with context.Pool(num_jobs) as pool:
+                results = pool.imap(worker_func, tasks, chunk_size)
+                if desc:
+                    from tqdm import tqdm  # Deferred import
+
+                    results = tqdm(results, total=len(tasks), desc=desc)
+                return list(results)
+        finally:
+            WORKER_AUTOBREAK = None
+
+    def solve_sequence_offset(self, offset):
+        """Run autobreak for a sequence offset and return the complete solution"""
+        # Shift the sequence to the offset
+        self.shift_scaffold_sequence(offset)
+
+        # Use the cached solution of the offset
+        if self.load_cached_solution(offset):
+            return self.complete_solutions.get(offset)
+
+        # Seed the random generator for the offset
+        self.seed_sequence_offset(offset)
+
+        # Run autobreak
+        self.run_autobreak()
+
+        # Cache the solution
+        self.store_cached_solution(offset)
+
+        return self.complete_solutions.get(offset)
+
+    def get_cache_key(self, offset):
+        """Get the result cache key for a sequence offset"""
+        if self.design_hash is None:
+            self.design_hash = utilities.get_files_hash(
+                self.origami.json_input, self.origami.sequence_file
+            )
+
+        # Oligos that are not broken
+        dont_break_oligos = sorted(
+            oligo.key for oligo in self.origami.oligos["staple"] if oligo.dont_break
+        )
+
+        return self.result_cache.get_key(
+            self.design_hash,
+            self.break_rule,
+            self.optim_args,
+            self.optim_score_functions,
+            self.LOWER_BOUND,
+            self.UPPER_BOUND,
+            self.NUM_OLIGO_SOLUTIONS,
+            self.NUM_GLOBAL_SOLUTIONS,
+            self.optim_shuffle_oligos,
+            self.optim_pick_method,
+            self.k_select,
+            self.compact_graph,
+            self.group_solver,
+            self.group_time_budget,
+            self.group_num_candidates,
+            self.random_seed,
+            dont_break_oligos,
+            offset,
+        )
+
+    def load_cached_solution(self, offset):
+        """Load the complete solution of a sequence offset from the result cache"""
+        if self.result_cache is None:
+            return False
+
+        hit, cache_entry = self.result_cache.load(self.get_cache_key(offset))
+        if not hit:
+            return False
+
+        # Offsets without a complete solution are cached without a record
+        if cache_entry["record"]:
+            self.complete_solutions[offset] = self.complete_solution_from_record(
+                cache_entry["record"]
+            )
+
+        return True
+
+    def store_cached_solution(self, offset):
+        """Store the complete solution of a sequence offset in the result cache"""
+        if self.result_cache is None:
+            return
+
+        cache_entry = {"summary": None, "record": None}
+
+        complete_solution = self.complete_solutions.get(offset)
+        if complete_solution:
+            cache_entry["summary"] = {
+                "total_score": complete_solution.total_score,
+                "total_norm_score": complete_solution.total_norm_score,
+                "total_prob": complete_solution.total_prob,
+                "total_penalty": complete_solution.total_penalty,
+                "total_dsDNA_length": complete_solution.total_dsDNA_length,
+            }
+            cache_entry["record"] = complete_solution.to_record()
+
+        self.result_cache.store(self.get_cache_key(offset), cache_entry)
+
+    def complete_solution_from_record(self, record):
+        """Rebuild a complete solution from its record"""
+        complete_solution = CompleteBreakSolution()
+        complete_solution.group_solutions = {}
+        complete_solution.sequence_offset = record["sequence_offset"]
+
+        for key, group_record in record["group_solutions"].items():
+            # If the group solution doesnt exist move to next group
+            if group_record is None:
+                complete_solution.group_solutions[key] = None
+                continue
+
+            complete_solution.group_solutions[key] = self.group_solution_from_record(
+                group_record
+            )
+
+        # Calculate the total score for the complete solution
+        complete_solution.calculate_total_score()
+
+        return complete_solution
+
+    def group_solution_from_record(self, record):
+        """Rebuild a group solution from its record"""
+        group_solution = GroupBreaksolution()
+        group_solution.break_solutions = {}
+        group_solution.origami = self.origami
+
+        for oligo_key, oligo_record in record.items():
+            if oligo_record is None:
+                group_solution.break_solutions[oligo_key] = None
+            else:
+                group_solution.break_solutions[oligo_key] = (
+                    self.oligo_solution_from_record(oligo_key, oligo_record)
+                )
+
+        # Calculate the penalties for the group solution
+        group_solution.calculate_penalty()
+
+        return group_solution
+
+    def oligo_solution_from_record(self, oligo_key, record):
+        """Rebuild an oligo break solution from its record"""
+        oligo = self.origami.oligo_map[oligo_key]
+
+        # Get the breaks and the edges connecting them
+        breaks = [oligo.breaks[i] for i in record["breaks"]]
+        edges = [
+            breaks[i].get_break_edge(breaks[i + 1]) for i in range(len(breaks) - 1)
+        ] + [None]
+
+        # Make the break paths in final to start order
+        break_paths = [
+            BreakPath(new_break, new_edge, score)
+            for new_break, new_edge, score in zip(breaks, edges, record["scores"])
+        ][::-1]
+
+        new_break_solution = OligoBreakSolution()
+        new_break_solution.start_break = breaks[0]
+        new_break_solution.final_break = breaks[-1]
+        new_break_solution.break_paths = break_paths
+        new_break_solution.score = record["score"]
+        new_break_solution.origami = self.origami
+
+        # Initialize the solution
+        new_break_solution.initialize()
+        new_break_solution.calculate_self_penalty()
+
+        return new_break_solution
+
     def permute_scaffold_sequence_readonly(self, nitr=100):
         """Permute scaffold sequence"""
         # Set start offset
@@ -1406,45 +1834,115 @@ class AutoBreak:
     def create_stepwise_group_solutions(self):
         """Main function for solution determination"""
 
+        # Distribute the independent oligo groups over worker processes
+        if self.use_workers(len(self.origami.oligo_groups)):
+            self.create_stepwise_group_solutions_parallel()
+            return
+
         for oligo_group in self.origami.oligo_groups:
+            self.create_oligo_group_solutions(oligo_group)
+
+    def create_stepwise_group_solutions_parallel(self):
+        """
+        Create stepwise group solutions in forked worker processes
+
+        Oligo groups don't share break nodes, so each group is solved independently and
+        its solution records are rebuilt in group order on the graph of the parent.
+        """
+        group_indices = list(range(len(self.origami.oligo_groups)))
+        records = self.map_workers(create_group_solutions_worker, group_indices)
 
-            # Sort oligos by length
-            oligo_group.sort_oligos_by_length(reverse=True)
+        for oligo_group, group_records in zip(self.origami.oligo_groups, records):
+            oligo_group.group_solutions = [
+                self.group_solution_from_record(group_record)
+                for group_record in group_records
+            ]
 
-            # Create solutions via stepwise approach
-            oligo_group.create_stepwise_oligo_solutions(
-                self.NUM_OLIGO_SOLUTIONS,
-                self.NUM_GLOBAL_SOLUTIONS,
-                self.optim_pick_method,
-                self.optim_shuffle_oligos,
-                verbose=self.verbose_output,
+    def create_oligo_group_solutions(self, oligo_group):
+        """Create the solutions for an oligo group with the group solver"""
+        if self.group_solver == "exact":
+            if self.create_exact_oligo_group_solutions(oligo_group):
+                return
+            tracing.info(
+                "No exact solution for oligo group %s, using stepwise", oligo_group.key
             )
 
-            # Remove incomplete solutions
-            oligo_group.remove_incomplete_solutions()
+        self.create_stepwise_oligo_group_solutions(oligo_group)
+
+    def create_exact_oligo_group_solutions(self, oligo_group):
+        """Create the best conflict free solution for an oligo group"""
+        oligo_group.create_exact_oligo_solutions(
+            self.group_num_candidates,
+            self.group_time_budget,
+            verbose=self.verbose_output,
+        )
+
+        # Remove incomplete solutions
+        oligo_group.remove_incomplete_solutions()
+
+        return len(oligo_group.group_solutions) > 0
+
+    def create_stepwise_oligo_group_solutions(self, oligo_group):
+        """Create stepwise solutions for an oligo group"""
+        # Seed the random generator for the group
+        random.seed(
+            "%s.%s.%s"
+            % (self.random_seed, self.origami.sequence_offset, oligo_group.key)
+        )
+
+        # Sort oligos by length
+        oligo_group.sort_oligos_by_length(reverse=True)
+
+        # Create solutions via stepwise approach
+        oligo_group.create_stepwise_oligo_solutions(
+            self.NUM_OLIGO_SOLUTIONS,
+            self.NUM_GLOBAL_SOLUTIONS,
+            self.optim_pick_method,
+            self.optim_shuffle_oligos,
+            verbose=self.verbose_output,
+        )
+
+        # Remove incomplete solutions
+        oligo_group.remove_incomplete_solutions()
 
     def update_edge_weights(self):
         """Update edge weights"""
+        # Update the weights on the break graph arrays
+        if self.origami.break_graph is not None:
+            self.origami.break_graph.update_weights()
+            return
+
         for oligo in self.origami.oligos["staple"]:
             # Visit each break object
             for current_break in oligo.breaks:
                 # Iterate over the break edges
                 for break_edge in current_break.break_edges:
-                    # Update edge weights
-                    break_edge.update_connection()
+                    # Update sequence dependent edge weights
+                    break_edge.update_sequence()
 
     def initialize(self):
         """Initialize the connectivity maps"""
 
-        for oligo in self.origami.oligos["staple"]:
-            # Check oligo length, if the length is within length limits dont break it
-            if oligo.length < self.LOWER_BOUND:
-                oligo.dont_break = True
+        # Reset the maps of a previous initialization
+        self.origami.break_edge_map = {}
+        self.origami.break_graph = None
+        self.edge_window = None
+
+        # Initialize the compact break graph
+        break_graph = None
+        if self.compact_graph:
+            break_graph = BreakGraph()
+            break_graph.initialize(self)
 
+        # If the oligo length is within length limits dont break it
+        self.set_dont_break_short_oligos()
+
+        for oligo in self.origami.oligos["staple"]:
             # Visit each break object
             for current_break in oligo.breaks:
                 # Initialize the break edges
                 current_break.break_edges = []
+                current_break.loop_edge = None
 
                 # Get next break
                 next_break = current_break.next_break
@@ -1483,9 +1981,10 @@ class AutoBreak:
                         current_break.break_edges.append(new_edge)
 
                         # Add break edge to edge map
-                        self.origami.break_edge_map[
-                            current_break.key + next_break.key
-                        ] = new_edge
+                        if break_graph is None:
+                            self.origami.break_edge_map[
+                                current_break.key + next_break.key
+                            ] = new_edge
 
                     # Stop criteria
                     if break_distance > self.UPPER_BOUND or next_break == current_break:
@@ -1493,6 +1992,81 @@ class AutoBreak:
 
                     next_break = next_break.next_break
 
+                # Keep the edge superset for the length window masks
+                if break_graph is None:
+                    current_break.all_break_edges = current_break.break_edges
+                    current_break.all_loop_edge = current_break.loop_edge
+
+            # Move the oligo edges to the break graph
+            if break_graph is not None:
+                break_graph.add_oligo(oligo)
+
+        # Make the break graph arrays
+        if break_graph is not None:
+            break_graph.finalize()
+            self.origami.break_graph = break_graph
+        else:
+            self.edge_window = (self.LOWER_BOUND, self.UPPER_BOUND)
+
+    def set_dont_break_short_oligos(self):
+        """Set dont break for oligos shorter than the lower bound"""
+        for oligo in self.origami.oligos["staple"]:
+            if oligo.length < self.LOWER_BOUND:
+                oligo.dont_break = True
+
+    def covers_edge_window(self, lower_bound, upper_bound):
+        """Determine if the break edge superset covers a length window"""
+        return (
+            self.edge_window is not None
+            and self.edge_window[0] <= lower_bound
+            and upper_bound <= self.edge_window[1]
+        )
+
+    def is_within_bounds(self, break_edge):
+        """Determine if a break edge is within the length bounds"""
+        return self.LOWER_BOUND <= break_edge.edge_length <= self.UPPER_BOUND
+
+    def mask_break_edges(self):
+        """Keep the superset break edges that are within the length bounds"""
+        for oligo in self.origami.oligos["staple"]:
+            for current_break in oligo.breaks:
+                current_break.break_edges = [
+                    break_edge
+                    for break_edge in current_break.all_break_edges
+                    if self.is_within_bounds(break_edge)
+                ]
+
+                # Loop edge
+                current_break.loop_edge = None
+                if current_break.all_loop_edge and self.is_within_bounds(
+                    current_break.all_loop_edge
+                ):
+                    current_break.loop_edge = current_break.all_loop_edge
+
+    def unmask_break_edges(self):
+        """Restore the break edge superset"""
+        for oligo in self.origami.oligos["staple"]:
+            for current_break in oligo.breaks:
+                current_break.break_edges = current_break.all_break_edges
+                current_break.loop_edge = current_break.all_loop_edge
+
+    def evict_result_cache(self):
+        """Evict old result cache entries"""
+        if self.result_cache is None:
+            return
+
+        tracing.info(
+            "Result cache hits: %d misses: %d",
+            self.result_cache.hits,
+            self.result_cache.misses,
+        )
+        self.result_cache.evict()
+
+    def reset_complete_solutions(self):
+        """Reset complete solutions"""
+        self.complete_solutions = {}
+        self.best_complete_solution = None
+
     def reset_temp_neighbor_constraints(self):
         """Reset temporary neighbor constraints"""
         for oligo in self.origami.oligos["staple"]:
@@ -1541,8 +2115,26 @@ class AutoBreak:
         luminance = 0.299 * rgb[0] + 0.587 * rgb[1] + 0.114 * rgb[2]
         return luminance < 128
 
+    def get_color_style(self, hex_color):
+        """Get the cached (fill, font) heatmap style of a hex color"""
+        import openpyxl  # Deferred import
+
+        if hex_color not in self.color_styles:
+            argb_color = self.convert_rgb_to_argb(hex_color)
+            font_color = "FFFFFF" if self.is_color_dark(hex_color) else "000000"
+            self.color_styles[hex_color] = (
+                openpyxl.styles.PatternFill(
+                    start_color=argb_color, end_color=argb_color, fill_type="solid"
+                ),
+                openpyxl.styles.Font(color=font_color),
+            )
+
+        return self.color_styles[hex_color]
+
     # Apply formatting to all sheets in the workbook
     def apply_formatting_to_all_sheets(self, workbook_path, column_name):
+        import openpyxl  # Deferred import
+
         # Load the workbook
         wb = openpyxl.load_workbook(workbook_path)
 
@@ -1564,22 +2156,14 @@ class AutoBreak:
                     cell_value = cell.value
                     # Only apply formatting if the cell has a value
                     if cell_value:
-                        argb_color = self.convert_rgb_to_argb(cell_value)
-                        cell.fill = openpyxl.styles.PatternFill(
-                            start_color=argb_color,
-                            end_color=argb_color,
-                            fill_type="solid",
-                        )
-                        font_color = (
-                            "FFFFFF" if self.is_color_dark(cell_value) else "000000"
-                        )
-                        cell.font = openpyxl.styles.Font(color=font_color)
+                        cell.fill, cell.font = self.get_color_style(cell_value)
 
         # Save the changes to the Excel file
         wb.save(workbook_path)
 
     def export_initial_scores(self, write_csv=False):
         """Export initial scores to final excel file"""
+        import pandas as pd  # Deferred import
 
         # Create a dummy Complete Break Solution object
         self.final_complete_break_solution = CompleteBreakSolution()
@@ -1618,42 +2202,21 @@ class AutoBreak:
         # Results header
         csv_header = self.final_complete_break_solution.csv_header
 
-        # Write the results
-        if os.path.exists(self.results_excel_file):
-            writer = pd.ExcelWriter(
-                self.results_excel_file,
-                engine="openpyxl",
-                mode="a",
-                if_sheet_exists="overlay",
-            )
-        else:
-            writer = pd.ExcelWriter(
-                self.results_excel_file, engine="openpyxl", mode="w"
-            )
-
         # Create data frames
         self.summary_frame = pd.DataFrame(np.array(self.final_summary_data)).T
 
-        # Create staples frames
+        # Create staples frames, keeping the numeric columns for the plots
         self.staples_frame = pd.DataFrame(
-            np.array(self.final_csv_rows), columns=self.csv_header
+            self.final_csv_rows, columns=self.csv_header
         ).sort_values(by="Tf")
 
-        # Write summary data
-        self.summary_frame.to_excel(
-            writer, sheet_name=str("Summary"), header=None, index=False
-        )
-
-        # Write staples data
-        self.staples_frame.to_excel(
-            writer, sheet_name=str("Final"), header=csv_header, index=False
-        )
-
-        # Save writer and close
-        writer.close()
-
-        # Apply heatmap coloring
-        self.apply_formatting_to_all_sheets(self.results_excel_file, "TfColor")
+        # Write summary and staples data
+        if self.has_output("excel"):
+            results_writer = self.get_results_writer()
+            results_writer.write_rows("Summary", self.summary_frame.values.tolist())
+            results_writer.write_rows(
+                "Final", self.staples_frame.values.tolist(), header=csv_header
+            )
 
         # Write the csv files
         if write_csv:
@@ -1897,6 +2460,9 @@ class AutoBreak:
 
 
 class BreakEdge:
+    # Low Tm threshold
+    LOW_TM = 60
+
     def __init__(self):
         """Break edge class"""
         self.autobreak = None
@@ -1907,7 +2473,6 @@ class BreakEdge:
         self.edge_length = None
         self.edge_maxseq = None
         self.edge_Tm = None
-        self.LOW_TM = 60
 
         # state parameters
         self.active = True
@@ -1925,12 +2490,17 @@ class BreakEdge:
         self.edge_numTm = None
 
         self.sequence_list = None
+        self.ssDNA_segment_list = None
+        self.dna_sequences_stale = True
+
+        # Edge id in the break graph
+        self.graph_id = None
 
         # Loop parameter
         self.isloop = False
 
-        # Output/plot parameters
-        self.csv_params = {}
+        # Output/plot parameters, created on demand by create_csv_params
+        self.csv_params = None
 
     def create_csv_params(self):
         """
@@ -1961,6 +2531,10 @@ class BreakEdge:
         22.  dGconc
         """
 
+        # Get the dna sequences for the current sequence offset
+        if self.dna_sequences_stale:
+            self.update_dna_sequences()
+
         oligo_group_key = -1
         if self.current_break.oligo_group:
             oligo_group_key = self.current_break.oligo_group.key
@@ -1990,21 +2564,7 @@ class BreakEdge:
         }
 
     def get_TfColor(self, Tf, min_Tf=30, max_Tf=70):
-        cmap = plt.get_cmap("coolwarm", max_Tf - min_Tf + 1)
-
-        # Reverse the colormap
-        reversed_cmap = cmap.reversed()
-
-        # Get color index
-        if Tf <= min_Tf:
-            cmap_index = 0
-        elif Tf >= max_Tf:
-            cmap_index = max_Tf - min_Tf
-        else:
-            cmap_index = int(Tf - min_Tf)
-
-        rgb = reversed_cmap(cmap_index)[:3]  # Get RGB value
-        hexcolor = matplotlib.colors.rgb2hex(rgb)  # Get HEX value
+        rgb, hexcolor = utilities.get_Tf_color(Tf, min_Tf, max_Tf)
         return hexcolor
 
     def get_csv_row_object(self):
@@ -2068,17 +2628,30 @@ class BreakEdge:
 
     def update_connection(self):
         """Update edge weights"""
+        # Update the offset-invariant structure of the edge
+        self.update_structure()
+
+        # Update the sequence dependent terms of the edge
+        self.update_sequence()
+
+    def update_structure(self):
+        """
+        Update the structural parameters of the edge
+
+        Segment boundaries, scaffold positions, loop energies, lengths and crossover
+        counts don't change when the scaffold sequence is rotated, so they are
+        computed once and reused by update_sequence at every sequence offset. Without
+        the scaffold windows the segment sequences are sliced at every offset, and
+        update_sequence recomputes the lengths from them.
+        """
 
         # Get the temperature parameter for dG optimization
         temperature_kelvin = self.autobreak.optim_temperature_kelvin
 
-        # Initialize sequence and dna list
+        # Initialize sequence, segment and position lists
         self.sequence_list = []
-        self.ssDNA_seq_list = []
-        self.dsDNA_seq_list = []
-
+        self.ssDNA_segment_list = []
         self.ssDNA_pos_list = []
-        self.dsDNA_pos_list = []
 
         # Make the sequence list
         self.sequence_list.append(self.current_break.sequence)
@@ -2109,92 +2682,47 @@ class BreakEdge:
         if len(self.sequence_list) == 1:
             start_point = self.current_break.break_point_adjusted + 1
             final_point = self.next_break.break_point_adjusted + 1
-            dna_sequence = self.current_break.strand.dna[start_point:final_point]
-            position_list = self.current_break.strand.scaffoldPos[
-                start_point:final_point
-            ]
-
-            if len(position_list) > 0:
-                self.ssDNA_pos_list.append(position_list)
-            if len(dna_sequence) > 0:
-                self.ssDNA_seq_list.append(dna_sequence)
+            self.add_ssDNA_segment(self.current_break.strand, start_point, final_point)
         else:
-            # 1. Get the 5' sequence
+            # 1. Get the 5' segment
             start_point = self.current_break.break_point_adjusted + 1
             final_point = self.current_break.sequence.strHigh + 1
-            dna_sequence = self.current_break.strand.dna[start_point:final_point]
-            position_list = self.current_break.strand.scaffoldPos[
-                start_point:final_point
-            ]
-
-            if len(position_list) > 0:
-                self.ssDNA_pos_list.append(position_list)
-            if len(dna_sequence) > 0:
-                self.ssDNA_seq_list.append(dna_sequence)
+            self.add_ssDNA_segment(self.current_break.strand, start_point, final_point)
 
-            # 2. Get the sequences in between
+            # 2. Get the segments in between
             for sequence in self.sequence_list[1:-1]:
                 self.ssDNA_pos_list.append(sequence.scaffoldPos)
-                self.ssDNA_seq_list.append(sequence.dna)
+                self.ssDNA_segment_list.append(
+                    (sequence.strand, sequence.strLow, sequence.strHigh + 1)
+                )
 
-            # 3. Get the 3' sequence
+            # 3. Get the 3' segment
             start_point = self.next_break.sequence.strLow
             final_point = self.next_break.break_point_adjusted + 1
-            dna_sequence = self.next_break.strand.dna[start_point:final_point]
-            position_list = self.next_break.strand.scaffoldPos[start_point:final_point]
+            self.add_ssDNA_segment(self.next_break.strand, start_point, final_point)
 
-            if len(position_list) > 0:
-                self.ssDNA_pos_list.append(position_list)
-            if len(dna_sequence) > 0:
-                self.ssDNA_seq_list.append(dna_sequence)
+        # Get the dna sequences for the current sequence offset
+        self.update_dna_sequences()
 
-        # Remove empty sequences
-        self.dsDNA_seq_list = [
-            dna.strip() for dna in self.ssDNA_seq_list if len(dna.strip()) > 0
-        ]
+        # Remove empty positions
         self.dsDNA_pos_list = [
             list(filter(lambda x: x, pos_list)) for pos_list in self.ssDNA_pos_list
         ]
 
-        # Replace all empty characters in ssDNA seq list with ?
-        self.ssDNA_seq_list = [dna.replace(" ", "?") for dna in self.ssDNA_seq_list]
-
         # Remove empty lists from positions list
         self.dsDNA_pos_list = list(filter(lambda x: len(x), self.dsDNA_pos_list))
 
         # Determine mean values for the positions
         self.dsDNA_mean_pos_list = [np.round(np.mean(x)) for x in self.dsDNA_pos_list]
 
-        # Determine Tm
-        self.Tm_list = np.array(
-            [utilities.sequence_to_Tm(dna) for dna in self.dsDNA_seq_list]
-        )
-
-        # 1. Determine intrinsic free energies
-        self.dG_intrin_list = []
-        self.dH_intrin_list = []
-        self.dS_intrin_list = []
-
-        for dna in self.dsDNA_seq_list:
-            (dGintrin, dHintrin, dSintrin) = utilities.sequence_to_dG_dH_dS(
-                dna, temperature_kelvin
-            )
-
-            # Add free energies to the lists
-            self.dG_intrin_list.append(dGintrin)
-            self.dH_intrin_list.append(dHintrin)
-            self.dS_intrin_list.append(dSintrin)
-
-        # Make the lists arrays
-        self.dG_intrin_list = np.array(self.dG_intrin_list)
-        self.dH_intrin_list = np.array(self.dH_intrin_list)
-        self.dS_intrin_list = np.array(self.dS_intrin_list)
+        # Determine the scaffold windows of the dsDNA segments
+        self.dsDNA_windows = self.get_dsDNA_windows()
 
         # Get scaffold parameters
         scaffold_length = self.origami.oligos["scaffold"][0].length
         is_scaffold_circular = self.origami.oligos["scaffold"][0].circular
 
-        # 2. Determine interfacial coupling energies
+        # Determine interfacial coupling energies
         self.dG_inter_list = []
         self.dS_inter_list = []
 
@@ -2213,7 +2741,7 @@ class BreakEdge:
         self.dG_inter_list = np.array(self.dG_inter_list)
         self.dS_inter_list = np.array(self.dS_inter_list)
 
-        # 3. Get free energy due to concentration
+        # Get free energy due to concentration
         dGconc, dSconc = utilities.conc_to_dG(temperature_kelvin)
 
         self.dG_conc = dGconc
@@ -2222,7 +2750,69 @@ class BreakEdge:
         # Get RT values
         self.RT = utilities.R * temperature_kelvin
 
-        # 4. Get total energies
+        # Determine the length parameters
+        self.update_lengths()
+
+    def update_lengths(self):
+        """Update the length parameters and the crossover count of the edge"""
+        # Determine lengths
+        self.ssDNA_length_list = np.array([len(dna) for dna in self.ssDNA_seq_list])
+        self.dsDNA_length_list = np.array([len(dna) for dna in self.dsDNA_seq_list])
+
+        # Length parameters
+        if len(self.dsDNA_length_list) > 0:
+            self.edge_maxseq = max(self.dsDNA_length_list)
+        else:
+            self.edge_maxseq = 0
+
+        self.edge_num14 = np.sum(self.dsDNA_length_list >= 14)
+        self.edge_has14 = int(self.edge_num14 > 0)
+
+        self.edge_num16 = np.sum(self.dsDNA_length_list >= 16)
+        self.edge_has16 = int(self.edge_num16 > 0)
+
+        # Determine structure score
+        self.edge_num_cross = len(self.dsDNA_seq_list)
+        self.edge_structure = self.edge_num_cross**2.0
+
+        # Check dsDNA list to decide on the validity of edge
+        if len(self.dsDNA_length_list) == 0:
+            self.valid = False
+
+    def update_sequence(self):
+        """Update the sequence dependent parameters and the edge weight"""
+
+        # Get the temperature parameter for dG optimization
+        temperature_kelvin = self.autobreak.optim_temperature_kelvin
+
+        # Determine nearest-neighbor terms for all dsDNA segments
+        if self.dsDNA_windows is None or self.origami.thermo_index is None:
+            # The segment sequences and their lengths change with the offset
+            self.update_dna_sequences()
+            self.update_lengths()
+            dH_NN, dS_NN, seq_lengths, gc_counts = utilities.get_NN_terms_batch(
+                self.dsDNA_seq_list
+            )
+        else:
+            # The sequences are sliced on demand for the outputs
+            self.dna_sequences_stale = True
+            dH_NN, dS_NN, seq_lengths, gc_counts = (
+                self.origami.thermo_index.get_NN_terms(*self.dsDNA_windows)
+            )
+
+        # Determine Tm
+        self.Tm_list = utilities.NN_terms_to_Tm(dH_NN, dS_NN, gc_counts, seq_lengths)
+
+        # 1. Determine intrinsic free energies
+        (
+            self.dG_intrin_list,
+            self.dH_intrin_list,
+            self.dS_intrin_list,
+        ) = utilities.NN_terms_to_dG_dH_dS(
+            dH_NN, dS_NN, seq_lengths, temperature_kelvin
+        )
+
+        # 2. Get total energies
         self.dG_total = (
             np.sum(self.dG_intrin_list) + np.sum(self.dG_inter_list) + self.dG_conc
         )
@@ -2231,53 +2821,82 @@ class BreakEdge:
         )
         self.dH_total = np.sum(self.dH_intrin_list)
 
-        # 5. Determine probabilities
+        # 3. Determine probabilities
         self.edge_prob = np.exp(-self.dG_total / self.RT) / (
             1.0 + np.exp(-self.dG_total / self.RT)
         )
 
-        # 6. Determine log-probabilities
+        # 4. Determine log-probabilities
         self.edge_logprob = np.log(self.edge_prob)
 
-        # 7. Estimate Tf in °C (∆G = ∆H-T∆S, when ∆G is 0)
+        # 5. Estimate Tf in °C (∆G = ∆H-T∆S, when ∆G is 0)
         self.edge_Tf = self.dH_total / self.dS_total - 273.15
 
-        # Determine lengths
-        self.ssDNA_length_list = np.array([len(dna) for dna in self.ssDNA_seq_list])
-        self.dsDNA_length_list = np.array([len(dna) for dna in self.dsDNA_seq_list])
-
         # Determine the edge weights
         if len(self.Tm_list) > 0:
             self.edge_maxTm = max(self.Tm_list)
         else:
             self.edge_maxTm = 0
 
-        # Length parameters
-        if len(self.dsDNA_length_list) > 0:
-            self.edge_maxseq = max(self.dsDNA_length_list)
-        else:
-            self.edge_maxseq = 0
-
-        self.edge_num14 = np.sum(self.dsDNA_length_list >= 14)
-        self.edge_has14 = int(self.edge_num14 > 0)
-
-        self.edge_num16 = np.sum(self.dsDNA_length_list >= 16)
-        self.edge_has16 = int(self.edge_num16 > 0)
-
         # Tm parameters
         self.edge_numTm = np.sum(self.Tm_list >= self.LOW_TM)
         self.edge_hasTm = np.sum(self.edge_numTm > 0)
 
-        # Determine structure score
-        self.edge_num_cross = len(self.dsDNA_seq_list)
-        self.edge_structure = self.edge_num_cross**2.0
-
         # Set edge weight
         self.set_edge_weight()
 
-        # Check dsDNA list to decide on the validity of edge
-        if len(self.dsDNA_length_list) == 0:
-            self.valid = False
+    def add_ssDNA_segment(self, strand, start_point, final_point):
+        """Add a strand segment to the ssDNA segment and position lists"""
+        position_list = strand.scaffoldPos[start_point:final_point]
+
+        if len(position_list) > 0:
+            self.ssDNA_pos_list.append(position_list)
+        if len(strand.dna[start_point:final_point]) > 0:
+            self.ssDNA_segment_list.append((strand, start_point, final_point))
+
+    def update_dna_sequences(self):
+        """Slice the segment dna sequences for the current sequence offset"""
+        ssDNA_seq_list = [
+            strand.dna[start_point:final_point]
+            for strand, start_point, final_point in self.ssDNA_segment_list
+        ]
+
+        # Remove empty sequences
+        self.dsDNA_seq_list = [
+            dna.strip() for dna in ssDNA_seq_list if len(dna.strip()) > 0
+        ]
+
+        # Replace all empty characters in ssDNA seq list with ?
+        self.ssDNA_seq_list = [dna.replace(" ", "?") for dna in ssDNA_seq_list]
+
+        self.dna_sequences_stale = False
+
+    def get_dsDNA_windows(self):
+        """
+        Get (start positions, lengths) of the scaffold windows for the dsDNA segments
+
+        Staple segments run antiparallel to the scaffold, so the last position of a
+        segment is the start of its scaffold window. Returns None if the thermodynamic
+        index is not available or the windows don't match the segment sequences.
+        """
+        thermo_index = self.origami.thermo_index
+        if thermo_index is None or len(self.dsDNA_pos_list) != len(
+            self.dsDNA_seq_list
+        ):
+            return None
+
+        # Get the window boundaries from the segment endpoints
+        start_positions = [pos_list[-1] for pos_list in self.dsDNA_pos_list]
+        final_positions = [pos_list[0] for pos_list in self.dsDNA_pos_list]
+        seq_lengths = thermo_index.get_window_lengths(start_positions, final_positions)
+
+        # Check the windows against the segment lengths
+        if not np.array_equal(
+            seq_lengths, [len(dna) for dna in self.dsDNA_seq_list]
+        ):
+            return None
+
+        return start_positions, seq_lengths
 
     def make_loop_edge(self):
         """Make loop edge"""
@@ -2287,6 +2906,8 @@ class BreakEdge:
 
 
 class BreakPath:
+    __slots__ = ("break_node", "break_edge", "score")
+
     def __init__(self, break_node, break_edge=None, score=0):
         """Break path object"""
         self.break_node = break_node
@@ -2295,6 +2916,54 @@ class BreakPath:
 
 
 class BreakNode:
+    __slots__ = (
+        "crossover",
+        "next_break",
+        "previous_break",
+        "neighbor_break",
+        "connected_breaks",
+        "break_edges",
+        "all_break_edges",
+        "edge_nodes",
+        "type",
+        "sequence",
+        "loop_edge",
+        "all_loop_edge",
+        "current_nucleotide",
+        "next_nucleotide",
+        "visited",
+        "active",
+        "break_state",
+        "dont_break",
+        "dont_break_temp",
+        "oligo_group",
+        "score",
+        "best_path_node",
+        "best_path_bits",
+        "shortest_path",
+        "shortest_paths",
+        "k_potential_paths",
+        "k_shortest_paths",
+        "k_path_entries",
+        "graph_id",
+        "traverse_path",
+        "shortest_score",
+        "order_id",
+        "break_point",
+        "break_point_adjusted",
+        "direction",
+        "distance",
+        "dsDNA",
+        "idx",
+        "insert",
+        "key",
+        "location",
+        "oligo",
+        "origami",
+        "strand",
+        "vh",
+    )
+
     def __init__(self):
         """Break node class"""
         self.crossover = None
@@ -2309,6 +2978,10 @@ class BreakNode:
         self.crossover = None
         self.loop_edge = None
 
+        # Break edge superset for length window masks
+        self.all_break_edges = None
+        self.all_loop_edge = None
+
         # Nucleotide parameters
         self.current_nucleotide = None
         self.next_nucleotide = None
@@ -2326,10 +2999,12 @@ class BreakNode:
         # Graph parameter
         self.score = -utilities.INFINITY
         self.best_path_node = None
-        self.best_path_nodes = None
+        self.best_path_bits = 0  # Bitset of the order ids on the best path
         self.shortest_paths = None
         self.k_potential_paths = None
         self.k_shortest_paths = None
+        self.k_path_entries = None
+        self.graph_id = None
         self.traverse_path = None
         self.shortest_score = 0
         self.order_id = None
@@ -2355,7 +3030,7 @@ class BreakNode:
     def reset_break_path(self):
         self.order_id = -1
         self.traverse_path = []
-        self.best_path_nodes = []
+        self.best_path_bits = 0
         self.best_path_node = None
         self.score = -utilities.INFINITY
         self.visited = False
@@ -2400,6 +3075,25 @@ class BreakNode:
             if not break_edge.next_break.dont_break
         ]
 
+    def get_break_edge(self, next_break):
+        """Return the break edge from self to next break"""
+        # Get the edge from the break graph
+        break_graph = self.get_break_graph()
+        if break_graph is not None:
+            return break_graph.get_break_edge_between(self, next_break)
+
+        for break_edge in self.break_edges:
+            if break_edge.next_break == next_break:
+                return break_edge
+        return None
+
+    def get_break_graph(self):
+        """Return the break graph if the break node belongs to it"""
+        break_graph = self.origami.break_graph
+        if break_graph is not None and break_graph.has_break(self):
+            return break_graph
+        return None
+
     def get_valid_edges(self):
         """Get edges that lead to break nodes that can be broken"""
 
@@ -2411,114 +3105,197 @@ class BreakNode:
         # Initialize k-shortest paths
         self.k_shortest_paths = []
 
-        # 1. Get the shortest paths
-        shortest_path = self.get_shortest_path(final_break)
+        # Get the break graph to solve on the graph arrays
+        break_graph = self.get_break_graph()
+
+        # 1. Get the k-best paths, random selection picks from a larger pool. A single
+        # path uses the same search, so the neighbor constraint is applied alike
+        num_paths = k_num if k_select == "best" else 2 * k_num
+        if break_graph is None:
+            final_entries = self.get_k_best_path_entries(final_break, num_paths)
+        else:
+            final_entries = break_graph.get_k_best_path_entries(
+                self, final_break, num_paths
+            )
 
         # If the here is no path found return empty list
-        if shortest_path is None:
+        if len(final_entries) == 0:
             return self.k_shortest_paths
 
-        # 2.Add best path to k-path list
-        self.k_shortest_paths = [shortest_path]
-        self.k_potential_paths = []
-        num_k_solutions = 1
+        # Check the final score of the best path
+        if final_entries[0][0] == 0:
+            final_entries = final_entries[:1]
 
-        # Check the final score of the path
-        if shortest_path.score == 0:
-            return self.k_shortest_paths
+        # 2. Select the paths
+        if k_select == "best":
+            self.k_potential_paths = []
+        else:
+            # Keep the best path and pick the rest randomly
+            self.k_potential_paths = final_entries[1:]
+            final_entries = [final_entries[0]] + random.sample(
+                self.k_potential_paths, min(k_num - 1, len(self.k_potential_paths))
+            )
 
-        # 3. Make the paths
-        while num_k_solutions < k_num:
+        # 3. Make the break solutions
+        for path_entry in final_entries[:k_num]:
+            if break_graph is None:
+                new_break_solution = self.make_break_solution(final_break, path_entry)
+            else:
+                new_break_solution = break_graph.make_break_solution(
+                    self, final_break, path_entry
+                )
+            self.k_shortest_paths.append(new_break_solution)
+        self.k_path_entries = None
 
-            # Get the last best path
-            last_solution = self.k_shortest_paths[-1]
+        return self.k_shortest_paths
 
-            # Iterate through the edges
-            for i in range(len(last_solution.edges[:-1])):
-                # Inactive edge list
-                inactive_edges = []
+    def get_k_best_path_entries(self, final_break, k_num):
+        """
+        Get the k-best path entries between current and final break points
 
-                for j in range(len(self.k_shortest_paths)):
+        Each break node keeps its k-best incoming path entries in a single forward pass
+        in order id order. An entry is (score, path bitset, previous break, rank of
+        the entry at the previous break, edge), so the paths share their prefixes.
+        """
+        # Get the break nodes in order id order
+        ordered_breaks = self.get_ordered_breaks(final_break)
+        neighbor_bits = self.get_neighbor_bits(ordered_breaks, final_break)
+
+        # Get the neighbor bits of the breaks after each break
+        constraint_bits = {}
+        later_bits = 0
+        for current_break in reversed(ordered_breaks):
+            constraint_bits[current_break] = later_bits
+            later_bits |= neighbor_bits[current_break]
+
+        # Initialize the path entries, the start break has an empty entry
+        path_entries = {self: [(0, 0, None, None, None)]}
+        final_entries = []
+
+        for new_break in ordered_breaks:
+            # If current node is final break, quit
+            if new_break == final_break and new_break != self:
+                break
 
-                    if last_solution.is_identical(self.k_shortest_paths[j], i):
-                        inactive_edges.append(last_solution.edges[i])
+            # Skip the break nodes that can't be reached
+            if new_break not in path_entries:
+                continue
 
-                        # Make the edge inactive
-                        last_solution.edges[i].active = False
+            # Keep the k-best entries that the neighbor constraints can't tell apart
+            new_entries = utilities.select_k_best_entries(
+                path_entries[new_break], k_num, constraint_bits[new_break]
+            )
+            path_entries[new_break] = new_entries
 
-                # Reset break paths and find solution
-                self.oligo.reset_break_paths()
-                self.oligo.reset_break_order_ids(self, final_break)
+            # Get the order id bit of the new break
+            break_bit = 1 << new_break.order_id
 
-                # Get sub solution
-                potential_solution = self.get_shortest_path(final_break)
+            for break_edge in new_break.get_valid_edges():
+                # If id difference is in wrong direction and if it is a loop, discard the edge
+                next_break = break_edge.next_break
+                if not new_break.is_break_edge_possible(next_break):
+                    continue
 
-                # Make the edges active again
-                for edge in inactive_edges:
-                    edge.active = True
+                # Wrapping edges of circular oligos arrive at the final break
+                if next_break == self:
+                    next_entries = final_entries
+                else:
+                    next_entries = path_entries.setdefault(next_break, [])
+                neighbor_bit = neighbor_bits.get(next_break, 0)
+
+                for rank, (score, path_bits, _, _, _) in enumerate(new_entries):
+                    # Discard the paths that include the neighbor of the next break
+                    if (path_bits | break_bit) & neighbor_bit:
+                        continue
+
+                    # Determine the new score
+                    if new_break.order_id == 0:
+                        new_score = break_edge.edge_weight
+                    else:
+                        new_score = score + break_edge.edge_weight
+
+                    next_entries.append(
+                        (new_score, path_bits | break_bit, new_break, rank, break_edge)
+                    )
 
-                # If there is no solution continue
-                if potential_solution is None:
-                    continue
+        # Collect the entries for the final break
+        if self != final_break:
+            final_entries = path_entries.get(final_break, [])
 
-                # Get the first solution in the list
-                new_solution = potential_solution
+        # Finally add the loop connection
+        if self == final_break and self.loop_edge and self.loop_edge.is_valid():
+            final_entries.append(
+                (self.loop_edge.edge_weight, 0, self, 0, self.loop_edge)
+            )
 
-                # Add potential solution if it doesnt exist in k-shortest paths
-                potential_solution_exists = False
-                for solution in self.k_shortest_paths:
-                    if solution.is_identical(new_solution):
-                        potential_solution_exists = True
-                        break
+        # Keep the path entries to make the break solutions
+        self.k_path_entries = path_entries
 
-                # Add new solution to potential paths
-                if not potential_solution_exists:
-                    self.k_potential_paths.append(new_solution)
+        return heapq.nlargest(k_num, final_entries, key=lambda x: x[0])
 
-            # Check if the potential path list is empty, if empty quit
-            if len(self.k_potential_paths) == 0:
-                break
+    def make_break_solution(self, final_break, path_entry):
+        """Make the break solution for a path entry ending at the final break"""
+        # Make final node break path object
+        break_paths = [BreakPath(final_break, None, path_entry[0])]
 
-            # Sort the potential paths and add the best one to k-shortest paths list
-            self.k_potential_paths.sort(key=lambda x: x.score, reverse=True)
+        # Follow the entries back to the start break
+        score, _, previous_break, rank, break_edge = path_entry
+        while previous_break is not None:
+            break_paths.append(BreakPath(previous_break, break_edge, score))
 
-            if k_select == "best":
-                solution_index = 0
-            else:
-                # Add random one to the k-shortest paths
-                solution_index = random.randint(0, len(self.k_potential_paths) - 1)
+            # Stop at the start break
+            if previous_break == self:
+                break
 
-            # Add item to k-shortest path list
-            self.k_shortest_paths.append(self.k_potential_paths[solution_index])
+            score, _, previous_break, rank, break_edge = self.k_path_entries[
+                previous_break
+            ][rank]
 
-            # Update num solutions
-            num_k_solutions += 1
+        new_break_solution = OligoBreakSolution()
+        new_break_solution.start_break = self
+        new_break_solution.final_break = final_break
+        new_break_solution.break_paths = break_paths
+        new_break_solution.score = path_entry[0]
+        new_break_solution.origami = self.origami
 
-            # Remove the result from potential paths list
-            self.k_potential_paths.pop(solution_index)
+        # Initialize the solution
+        new_break_solution.initialize()
 
-        return self.k_shortest_paths
+        return new_break_solution
 
     def get_shortest_path(self, final_break):
-        """Find the shortest path between current and final break points"""
-        # Initialize the set and stack
-        stack = [self]
+        """
+        Find the shortest path between current and final break points
 
-        while stack:
-            # Pop the break node
-            new_break = stack.pop(0)
+        The break nodes are numbered along the oligo by Oligo.reset_break_order_ids and
+        edges only go forward in order id (or back to the start of a circular oligo),
+        so a single pass in order id order visits each node after all its predecessors
+        """
+        # Get the break nodes in order id order
+        ordered_breaks = self.get_ordered_breaks(final_break)
+        neighbor_bits = self.get_neighbor_bits(ordered_breaks, final_break)
+
+        for new_break in ordered_breaks:
+            # Skip the break nodes that can't be reached
+            if not (new_break == self or new_break.visited):
+                continue
 
             # If current node is final break, quit
-            if final_break.visited and new_break == final_break:
+            if new_break == final_break and new_break != self:
                 break
 
-            # Get valid break edges
-            valid_break_edges = new_break.get_valid_edges()
+            # Get the bitset for the paths going through the new break
+            path_bits = new_break.best_path_bits | (1 << new_break.order_id)
 
             # Update the scores for connected breaks
-            for break_edge in valid_break_edges:
+            for break_edge in new_break.get_valid_edges():
                 # If id difference is in wrong direction and if it is a loop, discard the edge
-                if not new_break.is_break_edge_possible(break_edge.next_break):
+                next_break = break_edge.next_break
+                if not new_break.is_break_edge_possible(next_break):
+                    continue
+
+                # Discard the paths that include the neighbor of the next break
+                if path_bits & neighbor_bits.get(next_break, 0):
                     continue
 
                 # Determine the new score
@@ -2526,30 +3303,17 @@ class BreakNode:
                     new_score = break_edge.edge_weight
                 else:
                     new_score = new_break.score + break_edge.edge_weight
-                logging.debug(
-                    f"Considering edge: current_score={new_break.score}, edge_weight={break_edge.edge_weight}, new_score={new_score}"
-                )
-                # Update the score based on the existence of a neighbor crossover
-                if new_break.neighbor_break in new_break.best_path_nodes:
-                    new_score += -utilities.INFINITY * utilities.INFINITY
-
-                # Make new break Path object
-                new_break_path = BreakPath(new_break, break_edge, new_score)
-
-                # If new score is higher than the previous one, make a new list
-                if new_score > break_edge.next_break.score:
-                    break_edge.next_break.best_path_node = new_break_path
-                    break_edge.next_break.best_path_nodes = (
-                        new_break.best_path_nodes + [new_break]
-                    )
-                    break_edge.next_break.score = new_score
 
-                # Add next break to connected breaks list
-                if not break_edge.next_break.visited:
-                    stack.append(break_edge.next_break)
+                # If new score is higher than the previous one, update the best path
+                if new_score > next_break.score:
+                    next_break.best_path_node = BreakPath(
+                        new_break, break_edge, new_score
+                    )
+                    next_break.best_path_bits = path_bits
+                    next_break.score = new_score
 
                 # Make the next break visited
-                break_edge.next_break.visited = True
+                next_break.visited = True
 
         # Finally compare with the loop connection
         if self == final_break and self.loop_edge and self.loop_edge.is_valid():
@@ -2567,6 +3331,45 @@ class BreakNode:
 
         return final_break.shortest_path
 
+    def get_neighbor_bits(self, ordered_breaks, final_break):
+        """
+        Get the order id bit of the neighbor break for each break node
+
+        Paths through the neighbor of a break node are discarded when they are added
+        to the node, before its paths are ranked. The final break has no neighbor
+        constraint.
+        """
+        neighbor_bits = {}
+        for current_break in ordered_breaks:
+            neighbor_break = current_break.neighbor_break
+            if (
+                current_break != final_break
+                and neighbor_break is not None
+                and neighbor_break.oligo == current_break.oligo
+                and neighbor_break.order_id >= 0
+            ):
+                neighbor_bits[current_break] = 1 << neighbor_break.order_id
+            else:
+                neighbor_bits[current_break] = 0
+
+        return neighbor_bits
+
+    def get_ordered_breaks(self, final_break):
+        """Get the break nodes from self to final break in order id order"""
+        ordered_breaks = [self]
+
+        next_break = self.next_break
+        while next_break and next_break != self:
+            ordered_breaks.append(next_break)
+
+            # Stop at the final break
+            if next_break == final_break:
+                break
+
+            next_break = next_break.next_break
+
+        return ordered_breaks
+
     def traverse_best_path(self, start_break):
 
         # Initialize shortest path
@@ -2699,6 +3502,17 @@ class DefaultArgs(argparse.Namespace):
     permute = False  # Permute sequence
     writeall = False  # Write all results
     csv = False  # Export results in csv format
+    compact = False  # Use the compact array-backed break graph
+    cache_dir = None  # Result cache directory
+    cache_max_size = None  # Maximum result cache size in MB
+    cache_max_age = None  # Maximum result cache entry age in days
+    trace = "off"  # Trace level (off, info, debug)
+    trace_buffer = None  # Binary trace ring buffer dump file
+    profile = False  # Profile the pipeline phases
+    outputs = None  # Comma separated output artifacts, None for all
+    group_solver = "stepwise"  # Oligo group solver (stepwise, exact)
+    time_budget = 1.0  # Exact group solver time budget per oligo group in seconds
+    jobs = 1  # Number of worker processes for the permutation loop
 
 
 def parse_args_from_shell():
@@ -2740,6 +3554,65 @@ def parse_args_from_shell():
     parser.add_argument(
         "--npermute", type=int, default=1, help="Number of permutations"
     )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="Number of worker processes"
+    )
+    parser.add_argument(
+        "--compact", action="store_true", help="Use compact array break graph"
+    )
+    parser.add_argument(
+        "--cache-dir", type=str, default=None, help="Result cache directory"
+    )
+    parser.add_argument(
+        "--cache-max-size", type=float, default=None, help="Result cache size in MB"
+    )
+    parser.add_argument(
+        "--cache-max-age", type=float, default=None, help="Result cache age in days"
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default="off",
+        choices=list(tracing.LEVEL_NAMES),
+        help="Trace level of the log file",
+    )
+    parser.add_argument(
+        "--trace-buffer",
+        type=str,
+        default=None,
+        help="Keep the last traces in a ring buffer and dump it to this file",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write phase timings to profile.json and print a summary",
+    )
+    parser.add_argument(
+        "--group-solver",
+        type=str,
+        default="stepwise",
+        choices=GROUP_SOLVERS,
+        help="Oligo group solver, exact falls back to stepwise without a solution",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=1.0,
+        help="Exact group solver time budget per oligo group in seconds",
+    )
+    parser.add_argument(
+        "--outputs",
+        type=str,
+        default=None,
+        help="Comma separated outputs (%s), default all but zip"
+        % ", ".join(OUTPUT_TYPES),
+    )
+    parser.add_argument(
+        "--render",
+        type=str,
+        default=None,
+        help="Render the outputs of a saved result file, other arguments are ignored",
+    )
 
     args = parser.parse_args()
 
@@ -2753,7 +3626,54 @@ def parse_args_from_shell():
     return args
 
 
+def parse_render_args_from_shell():
+    """Get the render arguments, None if no result file is rendered"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--render", type=str, default=None)
+    parser.add_argument("--outputs", type=str, default=None)
+
+    args, _ = parser.parse_known_args()
+    if args.render is None:
+        return None
+
+    if not os.path.isfile(args.render):
+        sys.exit("Result file does not exist!")
+
+    return args
+
+
+def parse_outputs(outputs=None, is_notebook_session=False, add_dependencies=True):
+    """Parse comma separated outputs and add the outputs they are made from"""
+    if outputs is None:
+        # Notebook sessions return the zipped results
+        selected = set(OUTPUT_TYPES)
+        if not is_notebook_session:
+            selected.discard("zip")
+    else:
+        selected = set(
+            output.strip() for output in outputs.split(",") if output.strip()
+        )
+        unknown_outputs = selected - set(OUTPUT_TYPES)
+        if unknown_outputs:
+            raise ValueError(
+                "Unknown outputs %s, choose from %s"
+                % (", ".join(sorted(unknown_outputs)), ", ".join(OUTPUT_TYPES))
+            )
+
+    # Add the dependencies
+    pending = list(selected) if add_dependencies else []
+    while pending:
+        for dependency in OUTPUT_DEPENDENCIES.get(pending.pop(), []):
+            if dependency not in selected:
+                selected.add(dependency)
+                pending.append(dependency)
+
+    return selected
+
+
 def run(is_notebook_session, args=None):
+    profiler = None
+    new_autobreak = None
     try:
         if not is_notebook_session:
             args = parse_args_from_shell()
@@ -2772,13 +3692,19 @@ def run(is_notebook_session, args=None):
         random_seed = args.seed
         permute_sequence = args.permute
         write_all_results = args.writeall
+        outputs = parse_outputs(args.outputs, is_notebook_session)
         shuffle_oligos = not args.sort
         npermute = args.npermute
 
+        setup_logging(args)
+
+        if args.profile:
+            profiler = PhaseProfiler()
+
         logging.info("Initialization completed.")
-        logging.info(f"Input filename: {input_filename}")
-        logging.info(f"Output directory: {output_directory}")
-        logging.info(f"Sequence filename: {sequence_filename}")
+        logging.info("Input filename: %s", input_filename)
+        logging.info("Output directory: %s", output_directory)
+        logging.info("Sequence filename: %s", sequence_filename)
 
         args_dict = {
             "input": args.input,
@@ -2799,6 +3725,17 @@ def run(is_notebook_session, args=None):
             "writeall": args.writeall,
             "csv": args.csv,
             "sort": args.sort,
+            "jobs": args.jobs,
+            "compact": args.compact,
+            "cache_dir": args.cache_dir,
+            "cache_max_size": args.cache_max_size,
+            "cache_max_age": args.cache_max_age,
+            "trace": args.trace,
+            "trace_buffer": args.trace_buffer,
+            "profile": args.profile,
+            "outputs": args.outputs,
+            "group_solver": args.group_solver,
+            "time_budget": args.time_budget,
         }
         print(args_dict)
 
@@ -2812,15 +3749,24 @@ def run(is_notebook_session, args=None):
         new_origami.autobreak = new_autobreak
         new_autobreak.origami = new_origami
 
+        if profiler is not None:
+            instrument_profiler(profiler, new_origami, new_autobreak)
+
         new_autobreak.set_break_rule(break_rule)
         new_autobreak.set_solution_nums(1, global_solutions)
         new_autobreak.set_optimization_func(optimization_func)
         new_autobreak.set_score_func(score_func)
         new_autobreak.set_permute_sequence(permute_sequence)
+        new_autobreak.set_random_seed(random_seed)
+        new_autobreak.set_num_jobs(args.jobs)
+        new_autobreak.set_compact_graph(args.compact)
+        new_autobreak.set_group_solver(args.group_solver, args.time_budget)
+        new_autobreak.set_result_cache(get_result_cache(args))
         new_autobreak.set_oligo_shuffle_parameter(shuffle_oligos)
         new_autobreak.preprocess_optim_params()
         new_autobreak.set_verbose_output(verbose_output == 2)
         new_autobreak.set_output_directory(input_filename, output_directory)
+        new_autobreak.set_outputs(outputs)
         new_autobreak.set_write_all_results(write_all_results)
         new_autobreak.set_temperature_parameter()
         new_autobreak.set_lower_bound(args.minlength)
@@ -2845,8 +3791,10 @@ def run(is_notebook_session, args=None):
             new_origami.cluster_oligo_groups()
             new_origami.set_dont_break_oligos(dontbreak_less_than)
             new_autobreak.initialize()
-            new_autobreak.create_results_excel_file()
+            if "excel" in outputs:
+                new_autobreak.create_results_excel_file()
             new_autobreak.permute_scaffold_sequence_autobreak(npermute)
+            new_autobreak.evict_result_cache()
             new_autobreak.correct_complete_solution_offsets()
             new_autobreak.compare_complete_solutions()
             new_autobreak.write_results_summary()
@@ -2856,15 +3804,24 @@ def run(is_notebook_session, args=None):
 
         new_autobreak.determine_oligo_scores()
         new_autobreak.export_initial_scores(write_csv=args.csv)
+        new_autobreak.close_results_excel_file()
         new_autobreak.calc_minmax_plot_params()
-        new_autobreak.color_oligos_by_Tf()
-        new_origami.split_scaffold()
-        new_origami.set_cadnano_sequence_offset()
-        new_autobreak.write_final_part_to_json()
+
+        # The staple colors and the scaffold split are only kept in the json file
+        if "json" in outputs:
+            new_autobreak.color_oligos_by_Tf()
+            new_origami.split_scaffold()
+            new_origami.set_cadnano_sequence_offset()
+            new_autobreak.write_final_part_to_json()
+
         new_autobreak.copy_sequence_file()
-        new_autobreak.create_staple_heatmap(is_notebook_session)
-        new_autobreak.create_results_plots()
-        new_autobreak.create_summary_figure()
+        new_autobreak.write_result_file()
+        if "heatmap" in outputs:
+            new_autobreak.create_staple_heatmap(is_notebook_session)
+        if "plots" in outputs:
+            new_autobreak.create_results_plots()
+        if "summary" in outputs:
+            new_autobreak.create_summary_figure()
         new_autobreak.first_run_message()
 
         if new_autobreak.best_complete_solution:
@@ -2876,13 +3833,339 @@ def run(is_notebook_session, args=None):
             print("Gibbs Free Energy written to file.")
             logging.info("Gibbs Free Energy written to file.")
         if is_notebook_session:
-            return new_autobreak.zip_results()
+            if "zip" in outputs:
+                return new_autobreak.zip_results()
+            return new_autobreak.output_directory
         else:
+            if "zip" in outputs:
+                new_autobreak.zip_results()
             return new_autobreak, new_origami
     except Exception as e:
         print(f"An error occurred in run(): {e}")
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if profiler is not None:
+            write_profile(profiler, new_autobreak)
+        if args is not None and args.trace_buffer:
+            tracing.dump(args.trace_buffer)
+
+
+def render(result_filename, outputs=None, is_notebook_session=False):
+    """Render the outputs of a saved result file, return the rendered outputs"""
+    autobreak = AutoBreak()
+    result = autobreak.load_result_file(result_filename)
+
+    # The json and excel outputs need the design, they are only written by run
+    if outputs is None:
+        outputs = set(RENDER_OUTPUTS) - {"zip"}
+    else:
+        outputs = parse_outputs(outputs, add_dependencies=False)
+    for output in sorted(outputs - set(RENDER_OUTPUTS)):
+        print("Output %s can't be rendered from a result file" % output)
+
+    # Each output is rendered if the files it is made from exist
+    rendered = []
+    if "heatmap" in outputs and os.path.isfile(autobreak.json_legacy_output):
+        autobreak.create_staple_heatmap(is_notebook_session)
+        rendered.append("heatmap")
+    if "plots" in outputs and autobreak.staples_frame is not None:
+        autobreak.create_results_plots()
+        rendered.append("plots")
+    if (
+        "summary" in outputs
+        and os.path.isfile(autobreak.results_heatmap_path)
+        and os.path.isfile(autobreak.results_plots)
+    ):
+        autobreak.create_summary_figure()
+        rendered.append("summary")
+    if "zip" in outputs:
+        autobreak.zip_results()
+        rendered.append("zip")
+
+    print("Rendered %s: %s" % (result["name"], ", ".join(rendered) or "nothing"))
+    return rendered
+
+
+def instrument_profiler(profiler, origami, autobreak):
+    """Profile the pipeline phases and the hot functions"""
+    # 1. Pipeline phases
+    profiler.instrument(
+        origami,
+        [
+            "initialize",
+            "prepare_origami",
+            "cluster_oligo_groups",
+            "split_scaffold",
+        ],
+    )
+    profiler.instrument(
+        autobreak,
+        [
+            "initialize",
+            "create_results_excel_file",
+            "permute_scaffold_sequence_autobreak",
+            "permute_scaffold_sequence_readonly",
+            "evict_result_cache",
+            "correct_complete_solution_offsets",
+            "compare_complete_solutions",
+            "write_results_summary",
+            "write_best_result",
+            "break_best_complete_solution",
+            "determine_oligo_scores",
+            "export_initial_scores",
+            "close_results_excel_file",
+            "color_oligos_by_Tf",
+            "write_final_part_to_json",
+            "create_staple_heatmap",
+            "create_results_plots",
+            "create_summary_figure",
+            "write_result_file",
+            "zip_results",
+        ],
+    )
+
+    # 2. Hot functions: edge scoring, path search and penalty calculation. When this
+    # file runs as a script, origamidesign makes its break nodes and group solutions
+    # from a second copy imported as autobreak_main, so the classes of both copies
+    # are wrapped.
+    import autobreak_main  # Deferred import
+
+    modules = [sys.modules[__name__]]
+    if autobreak_main is not modules[0]:
+        modules.append(autobreak_main)
+
+    for module in modules:
+        profiler.instrument(
+            module.AutoBreak,
+            ["optimize", "update_edge_weights", "solve_sequence_offset"],
+            kind="function",
+        )
+        profiler.instrument(
+            module.BreakNode,
+            ["get_k_shortest_paths", "get_shortest_path", "get_k_best_path_entries"],
+            kind="function",
+        )
+        profiler.instrument(
+            module.GroupBreaksolution, ["calculate_penalty"], kind="function"
+        )
+    profiler.instrument(
+        BreakGraph,
+        ["update_weights", "get_k_best_path_entries", "calculate_penalty"],
+        kind="function",
+    )
+
+
+def write_profile(profiler, autobreak):
+    """Remove the profiler wrappers, write the profile and print the summary"""
+    profiler.restore()
+
+    if autobreak is not None and os.path.isdir(autobreak.output_directory):
+        profiler.write_json(os.path.join(autobreak.output_directory, "profile.json"))
+
+    profiler.print_summary()
+
+
+def setup_logging(args):
+    """Set up the log file and the trace sinks"""
+    trace_level = tracing.LEVEL_NAMES[args.trace]
+
+    # Traces at debug level need a debug level log file
+    log_level = logging.DEBUG if trace_level == tracing.DEBUG else logging.INFO
+    logging.basicConfig(
+        filename=log_file,
+        level=log_level,
+        format="%(asctime)s %(levelname)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    # Keep the last traces in memory only when they are dumped
+    ring_buffer_size = 100000 if args.trace_buffer else 0
+    if args.trace_buffer and trace_level == tracing.OFF:
+        trace_level = tracing.DEBUG
+    tracing.configure(
+        trace_level,
+        logging.getLogger("autobreak") if args.trace != "off" else None,
+        ring_buffer_size,
+    )
+
+
+def get_result_cache(args):
+    """Get the result cache for the arguments"""
+    if not args.cache_dir:
+        return None
+
+    # Convert the limits to bytes and seconds
+    max_size = None
+    if args.cache_max_size is not None:
+        max_size = args.cache_max_size * 1024**2
+
+    max_age = None
+    if args.cache_max_age is not None:
+        max_age = args.cache_max_age * 24 * 3600
+
+    return ResultCache(args.cache_dir, max_size, max_age)
+
+
+def prepare_design(input_filename, sequence_filename=None, rule=DefaultArgs.rule):
+    """
+    Read and prepare a cadnano design for in-process evaluations
+
+    The break rule determines the break points, so the prepared origami can only be
+    evaluated with the rule it was prepared with.
+    """
+    new_origami = Origami()
+    new_autobreak = AutoBreak()
+
+    new_origami.autobreak = new_autobreak
+    new_autobreak.origami = new_origami
+
+    new_autobreak.set_break_rule(utilities.parse_break_rule(rule))
+    new_origami.initialize(input_filename)
+    new_origami.set_sequence_file(sequence_filename)
+    new_origami.set_circularize(True)
+    new_origami.prepare_origami()
+    new_origami.cluster_oligo_groups()
+
+    # Evaluations start from the prepared sequence offset
+    new_origami.prepared_sequence_offset = new_origami.sequence_offset
+
+    return new_origami
+
+
+def evaluate(origami, params):
+    """
+    Run autobreak on a prepared origami and return the energy and the timings
+
+    The parameters use the command line argument names and missing parameters fall
+    back to DefaultArgs. No output files are written. The energy is None if no
+    complete solution is found.
+
+    The break edges are kept between evaluations for the widest length window seen.
+    If that window covers the requested one, the edges are only masked by length and
+    prepare_origami and initialize are skipped.
+    """
+    start_time = time.perf_counter()
+    timings = {}
+
+    args = DefaultArgs(**params)
+
+    # Check the break rule against the prepared origami
+    break_rule = utilities.parse_break_rule(args.rule)
+    if "rule" in params and break_rule != origami.break_rule:
+        raise ValueError(
+            "Origami was prepared for break rule %s, not %s"
+            % (".".join(origami.break_rule), args.rule)
+        )
+
+    # Reuse the autobreak object and the break edges of the prepared origami
+    autobreak = origami.autobreak
+    autobreak.reset_complete_solutions()
+
+    # Edge weights depend on the optimization functions
+    optim_args = utilities.parse_optim_function(args.func)
+    score_func = utilities.parse_score_function(args.score)
+    same_weights = (
+        autobreak.optim_args == optim_args
+        and autobreak.optim_score_functions == score_func
+    )
+
+    autobreak.set_solution_nums(1, args.nsol)
+    autobreak.set_optimization_func(optim_args)
+    autobreak.set_score_func(score_func)
+    autobreak.set_permute_sequence(args.permute)
+    autobreak.set_random_seed(args.seed)
+    autobreak.set_num_jobs(args.jobs)
+    autobreak.set_compact_graph(args.compact)
+    autobreak.set_group_solver(args.group_solver, args.time_budget)
+    autobreak.set_result_cache(get_result_cache(args))
+    autobreak.set_oligo_shuffle_parameter(not args.sort)
+    autobreak.preprocess_optim_params()
+    autobreak.set_verbose_output(args.verbose == 2)
+    autobreak.set_write_all_results(False)
+    autobreak.set_temperature_parameter()
+
+    random.seed(args.seed)
+
+    # The edge superset can be masked if it covers the length window
+    reuse_edges = (
+        not args.compact
+        and same_weights
+        and autobreak.covers_edge_window(args.minlength, args.maxlength)
+    )
+
+    # Reset the design state left by a previous evaluation
+    if reuse_edges:
+        # Bring the superset edge weights back to the prepared sequence offset
+        autobreak.unmask_break_edges()
+        if origami.sequence_offset != origami.prepared_sequence_offset:
+            origami.reset_sequence_offset()
+            autobreak.update_edge_weights()
+    else:
+        origami.reset_sequence_offset()
+
+    origami.reset_dont_break_oligos()
+    origami.set_dont_break_oligos(args.dontbreak)
+    timings["setup"] = time.perf_counter() - start_time
+
+    # Build the break graph
+    if not reuse_edges:
+        # Widen the window to the previous superset, so it is rebuilt rarely
+        lower_bound, upper_bound = args.minlength, args.maxlength
+        if not args.compact and same_weights and autobreak.edge_window:
+            lower_bound = min(lower_bound, autobreak.edge_window[0])
+            upper_bound = max(upper_bound, autobreak.edge_window[1])
+
+        autobreak.set_lower_bound(lower_bound)
+        autobreak.set_upper_bound(upper_bound)
+        autobreak.initialize()
+
+    autobreak.set_lower_bound(args.minlength)
+    autobreak.set_upper_bound(args.maxlength)
+    autobreak.set_dont_break_short_oligos()
+
+    # Mask the edges outside of the length window
+    if not args.compact:
+        autobreak.mask_break_edges()
+    timings["initialize"] = time.perf_counter() - start_time - timings["setup"]
+
+    # Solve the sequence offsets
+    autobreak.permute_scaffold_sequence_autobreak(args.npermute)
+    autobreak.evict_result_cache()
+    autobreak.compare_complete_solutions()
+
+    # Score the best solution with the edge weights of its own sequence offset
+    energy = None
+    best_complete_solution = autobreak.best_complete_solution
+    if best_complete_solution:
+        if origami.sequence_offset != best_complete_solution.sequence_offset:
+            autobreak.shift_scaffold_sequence(best_complete_solution.sequence_offset)
+        energy = best_complete_solution.calculate_gibbs_free_energy()
+
+    timings["total"] = time.perf_counter() - start_time
+    timings["solve"] = timings["total"] - timings["initialize"] - timings["setup"]
+
+    return energy, timings
+
+
+def solve_sequence_offset_worker(offset):
+    """Solve a sequence offset in a worker process and return the solution record"""
+    complete_solution = WORKER_AUTOBREAK.solve_sequence_offset(offset)
+
+    if complete_solution is None:
+        return None
+
+    return complete_solution.to_record()
+
+
+def create_group_solutions_worker(group_index):
+    """Solve an oligo group in a worker process and return the solution records"""
+    oligo_group = WORKER_AUTOBREAK.origami.oligo_groups[group_index]
+    WORKER_AUTOBREAK.create_oligo_group_solutions(oligo_group)
+
+    return [
+        group_solution.to_record() for group_solution in oligo_group.group_solutions
+    ]
 
 
 def calculate_and_print_initial_gibbs_free_energy(origami_instance):
@@ -2902,6 +4185,12 @@ def main():
 
     print("Notebook" if is_notebook_session else "Console", "mode.")
 
+    # Render the outputs of a saved result file
+    render_args = None if is_notebook_session else parse_render_args_from_shell()
+    if render_args is not None:
+        render(render_args.render, render_args.outputs, is_notebook_session)
+        return
+
     try:
         autobreak_instance, origami_instance = run(is_notebook_session)
         print("Script completed.")
@@ -0,0 +1,110 @@
+"""
+Startup benchmark for the autobreak modules.
+
+Imports each module in a fresh interpreter with python -X importtime and reports the
+import time of the module and its slowest direct imports:
+
+    python benchmarks/import_benchmark.py autobreak_main compute tuner
+
+With --check the benchmark fails if one of the compute modules imports a plotting,
+spreadsheet or SVG package at startup, those are only imported by the output phases.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should import only the solver dependencies
+COMPUTE_MODULES = ["autobreak_main", "compute", "origamidesign", "tuner"]
+
+# Packages that the compute modules shouldn't import at startup
+HEAVY_PACKAGES = [
+    "matplotlib",
+    "pandas",
+    "openpyxl",
+    "svgutils",
+    "cn2svg",
+    "tqdm",
+    "skopt",
+]
+
+
+def get_import_times(module_name):
+    """Import a module with -X importtime, return (package, self us, cumulative us)"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import %s" % module_name],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+
+    import_times = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_time, cumulative_time, package = line[len("import time:") :].split("|")
+        import_times.append(
+            (package.rstrip(), int(self_time), int(cumulative_time))
+        )
+
+    return import_times
+
+
+def get_direct_imports(import_times):
+    """Get the direct imports of the imported module, nested one level deeper"""
+    return [
+        (package.strip(), self_time, cumulative_time)
+        for package, self_time, cumulative_time in import_times
+        if package.startswith("   ") and not package.startswith("    ")
+    ]
+
+
+def get_heavy_packages(import_times):
+    """Get the heavy packages imported at startup"""
+    imported = set(package.strip().split(".")[0] for package, _, _ in import_times)
+    return [package for package in HEAVY_PACKAGES if package in imported]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Autobreak import benchmark")
+    parser.add_argument(
+        "modules", nargs="*", default=["autobreak_main", "compute"], help="Modules"
+    )
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports shown")
+    parser.add_argument(
+        "--check", action="store_true", help="Fail on heavy compute module imports"
+    )
+    args = parser.parse_args()
+
+    failed = False
+    for module_name in args.modules:
+        import_times = get_import_times(module_name)
+        direct_imports = get_direct_imports(import_times)
+        heavy_packages = get_heavy_packages(import_times)
+
+        # The imported module is reported last
+        total_time = import_times[-1][2]
+        print("%s: %.1f ms" % (module_name, total_time / 1000.0))
+        for package, self_time, cumulative_time in sorted(
+            direct_imports, key=lambda item: -item[2]
+        )[: args.top]:
+            print("    %-40s %10.1f ms" % (package, cumulative_time / 1000.0))
+
+        if heavy_packages:
+            print("    heavy packages: %s" % (", ".join(heavy_packages)))
+            if module_name in COMPUTE_MODULES:
+                failed = True
+
+    if args.check and failed:
+        sys.exit("Compute modules import heavy packages at startup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Memory benchmark for the autobreak object model.
+
+Object mode allocates N instances of the per-base/per-break classes and reports
+the traced peak, both for the slotted classes and for dict-backed copies of the
+same classes (the pre-__slots__ layout):
+
+    python benchmarks/memory_benchmark.py --objects 200000
+
+Design mode loads a cadnano design, builds the break graph and reports the peak
+RSS of the process. Run it on two revisions to compare before/after:
+
+    python benchmarks/memory_benchmark.py -i design.json [--compact]
+"""
+
+import argparse
+import gc
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utilities
+from origamidesign import Nucleotide, Strand, Sequence, Origami
+from autobreak_main import AutoBreak, BreakNode, BreakPath
+
+
+def get_peak_rss_mb():
+    """Get the peak resident set size of the process in MB"""
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak_rss / 1024.0**2
+    return peak_rss / 1024.0
+
+
+def make_dict_class(cls):
+    """Make a dict-backed copy of a slotted class"""
+    namespace = {
+        key: value
+        for key, value in cls.__dict__.items()
+        if key not in cls.__slots__ and key not in ["__slots__", "__dict__"]
+    }
+    return type(cls.__name__, (), namespace)
+
+
+def make_object(cls, attrs):
+    """Make an object with the attributes the design reader assigns"""
+    new_object = cls()
+
+    # Fill the externally assigned attributes
+    for attr in attrs:
+        if not hasattr(new_object, attr):
+            setattr(new_object, attr, None)
+
+    return new_object
+
+
+def measure_objects(cls, attrs, num_objects):
+    """Measure the traced peak for num_objects instances of a class"""
+    if cls.__name__ == "BreakPath":
+        factory = lambda: cls(None)
+    else:
+        factory = lambda: make_object(cls, attrs)
+
+    gc.collect()
+    tracemalloc.start()
+    objects = [factory() for i in range(num_objects)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del objects
+    gc.collect()
+
+    return peak
+
+
+def run_objects(num_objects):
+    """Run the object benchmark"""
+    print("%-12s %12s %12s %8s" % ("class", "dict B/obj", "slots B/obj", "ratio"))
+    for cls in [Nucleotide, Strand, Sequence, BreakNode, BreakPath]:
+        dict_cls = make_dict_class(cls)
+
+        peak_dict = measure_objects(dict_cls, cls.__slots__, num_objects)
+        peak_slots = measure_objects(cls, cls.__slots__, num_objects)
+
+        print(
+            "%-12s %12.1f %12.1f %8.2f"
+            % (
+                cls.__name__,
+                1.0 * peak_dict / num_objects,
+                1.0 * peak_slots / num_objects,
+                1.0 * peak_dict / peak_slots,
+            )
+        )
+
+
+def run_design(input_filename, compact=False, rule="xstap.all3"):
+    """Run the design benchmark"""
+    new_origami = Origami()
+    new_autobreak = AutoBreak()
+
+    new_origami.autobreak = new_autobreak
+    new_autobreak.origami = new_origami
+
+    new_autobreak.set_break_rule(utilities.parse_break_rule(rule))
+    new_autobreak.set_optimization_func(utilities.parse_optim_function("dG"))
+    new_autobreak.set_score_func(utilities.parse_score_function("sum"))
+    new_autobreak.set_compact_graph(compact)
+    new_autobreak.preprocess_optim_params()
+    new_autobreak.set_temperature_parameter()
+
+    start_time = time.perf_counter()
+    new_origami.initialize(input_filename)
+    new_origami.set_sequence_file()
+    new_origami.set_circularize(True)
+    new_origami.prepare_origami()
+    new_origami.cluster_oligo_groups()
+    new_autobreak.initialize()
+    total_time = time.perf_counter() - start_time
+
+    num_breaks = sum(len(oligo.breaks) for oligo in new_origami.oligos["staple"])
+
+    print("Design      : %s" % (input_filename))
+    print("Staple breaks: %d" % (num_breaks))
+    print("Build time  : %.2f s" % (total_time))
+    print("Peak RSS    : %.1f MB" % (get_peak_rss_mb()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Autobreak memory benchmark")
+    parser.add_argument("-i", "--input", type=str, default=None, help="Cadnano file")
+    parser.add_argument(
+        "--objects", type=int, default=100000, help="Objects per class"
+    )
+    parser.add_argument("--compact", action="store_true", help="Compact break graph")
+    parser.add_argument("--rule", type=str, default="xstap.all3", help="Break rule")
+    args = parser.parse_args()
+
+    if args.input:
+        run_design(args.input, args.compact, args.rule)
+    else:
+        run_objects(args.objects)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Stage timing benchmark on synthetic designs.
+
+Generates a synthetic design for each helix count, runs the autobreak stages on it and
+reports the stage times, the throughputs and the scaling exponent of each stage time
+with the design size:
+
+    python benchmarks/stage_benchmark.py --helices 4 8 16 32 --offsets 5
+
+The exponent is the slope of log(stage time) over log(staple bases), 1.0 is linear
+scaling. Use --json to keep the results for comparing two revisions.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utilities
+from origamidesign import Origami
+from autobreak_main import AutoBreak
+from synthetic_design import add_design_arguments, get_design_params, write_design
+
+# Benchmark stages
+STAGES = [
+    "prepare_origami",
+    "initialize",
+    "update_edge_weights",
+    "stepwise_solutions",
+    "permutation_sweep",
+    "export",
+]
+
+
+def timed(stage_times, stage, func, *args):
+    """Run a stage function and record its time"""
+    start_time = time.perf_counter()
+    result = func(*args)
+    stage_times[stage] = time.perf_counter() - start_time
+    return result
+
+
+def run_stages(input_filename, output_directory, args):
+    """Run the autobreak stages on a design, return the stage times and the counts"""
+    new_origami = Origami()
+    new_autobreak = AutoBreak()
+
+    new_origami.autobreak = new_autobreak
+    new_autobreak.origami = new_origami
+
+    new_autobreak.set_break_rule(utilities.parse_break_rule(args.rule))
+    new_autobreak.set_solution_nums(1, args.nsol)
+    new_autobreak.set_optimization_func(utilities.parse_optim_function("dG:50"))
+    new_autobreak.set_score_func(utilities.parse_score_function("sum"))
+    new_autobreak.set_permute_sequence(True)
+    new_autobreak.set_compact_graph(args.compact)
+    new_autobreak.set_oligo_shuffle_parameter(True)
+    new_autobreak.preprocess_optim_params()
+    new_autobreak.set_output_directory(input_filename, output_directory)
+    new_autobreak.set_temperature_parameter()
+    new_autobreak.set_lower_bound(args.minlength)
+    new_autobreak.set_upper_bound(args.maxlength)
+
+    # define_output_files redirects stderr, keep it for the benchmark output
+    stderr = sys.stderr
+    new_origami.initialize(input_filename)
+    new_origami.set_sequence_file()
+    new_origami.set_circularize(True)
+    new_autobreak.define_output_files()
+    sys.stderr = stderr
+
+    stage_times = {}
+
+    # 1. Prepare the design
+    start_time = time.perf_counter()
+    new_origami.prepare_origami()
+    new_origami.cluster_oligo_groups()
+    new_origami.set_dont_break_oligos(0)
+    stage_times["prepare_origami"] = time.perf_counter() - start_time
+
+    # 2. Build the break edges
+    timed(stage_times, "initialize", new_autobreak.initialize)
+    new_autobreak.create_results_excel_file()
+
+    # 3. Update the edge weights and solve a single offset
+    new_origami.apply_sequence(0)
+    new_origami.assign_strands_dna()
+    new_origami.update_sequences_dna()
+    timed(stage_times, "update_edge_weights", new_autobreak.update_edge_weights)
+    timed(
+        stage_times, "stepwise_solutions", new_autobreak.create_stepwise_group_solutions
+    )
+
+    # 4. Solve the offsets of the permutation loop
+    timed(
+        stage_times,
+        "permutation_sweep",
+        new_autobreak.permute_scaffold_sequence_autobreak,
+        args.offsets,
+    )
+
+    # 5. Export the results
+    start_time = time.perf_counter()
+    new_autobreak.correct_complete_solution_offsets()
+    new_autobreak.compare_complete_solutions()
+    new_autobreak.write_results_summary()
+    new_autobreak.write_best_result()
+    new_autobreak.close_results_excel_file()
+    stage_times["export"] = time.perf_counter() - start_time
+
+    # Get the design counts
+    staple_oligos = new_origami.oligos["staple"]
+    if new_origami.break_graph is not None:
+        num_edges = new_origami.break_graph.get_num_edges()
+    else:
+        num_edges = len(new_origami.break_edge_map)
+
+    counts = {
+        "oligos": len(staple_oligos),
+        "bases": sum(oligo.length for oligo in staple_oligos),
+        "breaks": sum(len(oligo.breaks) for oligo in staple_oligos),
+        "edges": num_edges,
+        "offsets": len(new_autobreak.complete_solutions),
+    }
+
+    return stage_times, counts
+
+
+def get_throughputs(stage_times, counts):
+    """Get the stage throughputs"""
+    return {
+        "edges/s initialize": counts["edges"] / stage_times["initialize"],
+        "edges/s weights": counts["edges"] / stage_times["update_edge_weights"],
+        "oligos/s stepwise": counts["oligos"] / stage_times["stepwise_solutions"],
+        "offsets/s sweep": counts["offsets"] / stage_times["permutation_sweep"],
+    }
+
+
+def get_scaling_exponents(results):
+    """Get the slope of log(stage time) over log(staple bases) of each stage"""
+    if len(results) < 2:
+        return {}
+
+    sizes = np.log([result["counts"]["bases"] for result in results])
+    exponents = {}
+    for stage in STAGES:
+        stage_times = np.log(
+            [max(result["stage_times"][stage], 1e-9) for result in results]
+        )
+        exponents[stage] = float(np.polyfit(sizes, stage_times, 1)[0])
+
+    return exponents
+
+
+def print_results(results, exponents):
+    """Print the stage times, the throughputs and the scaling exponents"""
+    print(
+        "%-8s %8s %8s %8s"
+        % ("helices", "oligos", "bases", "edges")
+        + "".join(" %12s" % stage[:12] for stage in STAGES)
+    )
+    for result in results:
+        counts = result["counts"]
+        print(
+            "%-8d %8d %8d %8d"
+            % (result["helices"], counts["oligos"], counts["bases"], counts["edges"])
+            + "".join(" %12.3f" % result["stage_times"][stage] for stage in STAGES)
+        )
+
+    print()
+    print("%-8s" % "helices" + "".join(" %20s" % name for name in results[0]["rates"]))
+    for result in results:
+        print(
+            "%-8d" % result["helices"]
+            + "".join(" %20.1f" % rate for rate in result["rates"].values())
+        )
+
+    if exponents:
+        print()
+        print("Scaling exponents (time ~ bases^k)")
+        for stage, exponent in exponents.items():
+            print("%-20s %6.2f" % (stage, exponent))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Autobreak stage benchmark")
+    parser.add_argument(
+        "--helices", type=int, nargs="+", default=[4, 8, 16], help="Helix counts"
+    )
+    add_design_arguments(parser)
+    parser.add_argument("--offsets", type=int, default=3, help="Sequence offsets")
+    parser.add_argument("--nsol", type=int, default=10, help="Number of solutions")
+    parser.add_argument("--rule", type=str, default="xstap.all3", help="Break rule")
+    parser.add_argument("--minlength", type=int, default=21, help="Minimum length")
+    parser.add_argument("--maxlength", type=int, default=60, help="Maximum length")
+    parser.add_argument("--compact", action="store_true", help="Compact break graph")
+    parser.add_argument("--json", type=str, default=None, help="Results json file")
+    args = parser.parse_args()
+
+    work_directory = tempfile.mkdtemp(prefix="autobreak_benchmark_")
+    results = []
+    try:
+        for num_helices in args.helices:
+            input_filename = os.path.join(
+                work_directory, "synthetic_%d.json" % num_helices
+            )
+            write_design(input_filename, **get_design_params(args, num_helices))
+
+            stage_times, counts = run_stages(
+                input_filename,
+                os.path.join(work_directory, "output_%d" % num_helices),
+                args,
+            )
+            results.append(
+                {
+                    "helices": num_helices,
+                    "counts": counts,
+                    "stage_times": stage_times,
+                    "rates": get_throughputs(stage_times, counts),
+                }
+            )
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+    exponents = get_scaling_exponents(results)
+    print_results(results, exponents)
+
+    if args.json:
+        with open(args.json, "w") as results_file:
+            json.dump(
+                {"args": vars(args), "results": results, "exponents": exponents},
+                results_file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
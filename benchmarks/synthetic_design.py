@@ -0,0 +1,300 @@
+"""
+Synthetic cadnano designs of controlled size for the benchmarks.
+
+The designs are honeycomb sheets in the cadnano 2 (vstrands) json format, which
+cadnano 2.5 reads through its legacy decoder. The scaffold snakes through the
+helices, the staple track is rewired with double crossovers between neighbor helices
+and cut into staples:
+
+    python benchmarks/synthetic_design.py -o design.json --helices 24 --length 420
+
+--crossover-density is the fraction of the possible staple crossover sites that are
+used, --circular-fraction is the fraction of the closed staple loops kept as circular
+staples. The other loops and the open staple paths are cut to the staple lengths.
+"""
+
+import argparse
+import json
+import random
+
+# Honeycomb helix length step
+HONEYCOMB_STEP = 21
+
+# Staple crossover site offsets within a step for even and odd helix pairs
+CROSSOVER_OFFSETS = (7, 14)
+
+# Staple colors
+STAPLE_COLORS = [13369344, 16204552, 11184640, 243362, 1507550, 7536862, 12060012]
+
+
+def get_staple_successor(helix, index, helix_length):
+    """Get the 3' neighbor of a staple base along its helix"""
+    # Staples run to lower indices on even helices, to higher indices on odd helices
+    next_index = index - 1 if helix % 2 == 0 else index + 1
+    if next_index < 0 or next_index >= helix_length:
+        return None
+    return (helix, next_index)
+
+
+def get_crossover_sites(num_helices, helix_length, crossover_density, rng):
+    """Get the staple crossover sites as (helix, index), the pair is (helix, helix+1)"""
+    sites = []
+    for helix in range(num_helices - 1):
+        offset = CROSSOVER_OFFSETS[helix % 2]
+        for index in range(offset, helix_length, HONEYCOMB_STEP):
+            if rng.random() < crossover_density:
+                sites.append((helix, index))
+    return sites
+
+
+def make_staple_track(num_helices, helix_length, crossover_density, rng):
+    """Make the staple successor map of the full staple track"""
+    successors = {}
+    for helix in range(num_helices):
+        for index in range(helix_length):
+            successors[(helix, index)] = get_staple_successor(
+                helix, index, helix_length
+            )
+
+    # Rewire the staples at the double crossover sites
+    for helix, index in get_crossover_sites(
+        num_helices, helix_length, crossover_density, rng
+    ):
+        for from_helix, to_helix in [(helix, helix + 1), (helix + 1, helix)]:
+            # The base that steps within the site pair crosses to the other helix
+            for site_index in [index - 1, index]:
+                successor = successors[(from_helix, site_index)]
+                if successor is not None and successor[1] in [index - 1, index]:
+                    successors[(from_helix, site_index)] = (to_helix, site_index)
+
+    return successors
+
+
+def get_staple_paths(successors):
+    """Get the open staple paths and the closed staple loops"""
+    has_predecessor = set(
+        successor for successor in successors.values() if successor is not None
+    )
+
+    visited = set()
+    paths = []
+    for base in sorted(successors):
+        if base in has_predecessor:
+            continue
+        path = []
+        while base is not None:
+            path.append(base)
+            visited.add(base)
+            base = successors[base]
+        paths.append(path)
+
+    # The remaining bases form closed loops
+    loops = []
+    for base in sorted(successors):
+        if base in visited:
+            continue
+        loop = []
+        while base not in visited:
+            loop.append(base)
+            visited.add(base)
+            base = successors[base]
+        loops.append(loop)
+
+    return paths, loops
+
+
+def get_staple_lengths(path_length, staple_length, staple_length_std, rng):
+    """Draw the staple lengths to cut a staple path into"""
+    min_length = max(1, staple_length - 2 * staple_length_std)
+
+    lengths = []
+    remaining = path_length
+    while remaining > 0:
+        length = int(round(rng.gauss(staple_length, staple_length_std)))
+        length = max(min_length, length)
+
+        # Merge a short remainder into the last staple
+        if remaining - length < min_length:
+            length = remaining
+        lengths.append(length)
+        remaining -= length
+
+    return lengths
+
+
+def cut_staples(
+    successors, staple_length, staple_length_std, circular_fraction, rng
+):
+    """Cut the staple paths into staples, return the 5' ends of the linear staples"""
+    paths, loops = get_staple_paths(successors)
+
+    # Open the loops that are not kept as circular staples
+    for loop in loops:
+        if rng.random() < circular_fraction:
+            continue
+        cut_position = rng.randrange(len(loop))
+        successors[loop[cut_position - 1]] = None
+        paths.append(loop[cut_position:] + loop[:cut_position])
+
+    # Cut the paths
+    five_prime_ends = []
+    for path in paths:
+        position = 0
+        for length in get_staple_lengths(
+            len(path), staple_length, staple_length_std, rng
+        ):
+            five_prime_ends.append(path[position])
+            position += length
+            successors[path[position - 1]] = None
+
+    return five_prime_ends
+
+
+def make_scaffold_track(num_helices, helix_length):
+    """Make the scaffold successor map of a scaffold that snakes through the helices"""
+    successors = {}
+    for helix in range(num_helices):
+        # Scaffold runs to higher indices on even helices, to lower on odd helices
+        if helix % 2 == 0:
+            indices = list(range(helix_length))
+        else:
+            indices = list(range(helix_length - 1, -1, -1))
+
+        for index, next_index in zip(indices[:-1], indices[1:]):
+            successors[(helix, index)] = (helix, next_index)
+
+        # Cross to the next helix at the helix end
+        if helix < num_helices - 1:
+            successors[(helix, indices[-1])] = (helix + 1, indices[-1])
+        else:
+            successors[(helix, indices[-1])] = None
+
+    return successors
+
+
+def get_strand_array(successors, helix, helix_length):
+    """Get the cadnano 2 strand array of a helix"""
+    predecessors = {
+        successor: base
+        for base, successor in successors.items()
+        if successor is not None
+    }
+
+    strand_array = []
+    for index in range(helix_length):
+        predecessor = predecessors.get((helix, index), (-1, -1))
+        successor = successors.get((helix, index)) or (-1, -1)
+        strand_array.append(
+            [predecessor[0], predecessor[1], successor[0], successor[1]]
+        )
+
+    return strand_array
+
+
+def make_design(
+    num_helices=8,
+    helix_length=210,
+    staple_length=100,
+    staple_length_std=20,
+    crossover_density=1.0,
+    circular_fraction=0.0,
+    seed=0,
+):
+    """Make a synthetic honeycomb design in the cadnano 2 json format"""
+    rng = random.Random(seed)
+
+    # Round the helix length up to the honeycomb step
+    helix_length = HONEYCOMB_STEP * (
+        (helix_length + HONEYCOMB_STEP - 1) // HONEYCOMB_STEP
+    )
+
+    # 1. Make the scaffold and the staples
+    scaffold_successors = make_scaffold_track(num_helices, helix_length)
+    staple_successors = make_staple_track(
+        num_helices, helix_length, crossover_density, rng
+    )
+    five_prime_ends = cut_staples(
+        staple_successors, staple_length, staple_length_std, circular_fraction, rng
+    )
+
+    # 2. Color the staples at their 5' ends
+    staple_colors = {helix: [] for helix in range(num_helices)}
+    for helix, index in sorted(five_prime_ends):
+        staple_colors[helix].append([index, rng.choice(STAPLE_COLORS)])
+
+    # 3. Make the helices, placed in a single honeycomb row
+    vstrands = []
+    for helix in range(num_helices):
+        vstrands.append(
+            {
+                "row": 0,
+                "col": helix,
+                "num": helix,
+                "scaf": get_strand_array(scaffold_successors, helix, helix_length),
+                "stap": get_strand_array(staple_successors, helix, helix_length),
+                "loop": [0] * helix_length,
+                "skip": [0] * helix_length,
+                "scafLoop": [],
+                "stapLoop": [],
+                "stap_colors": staple_colors[helix],
+            }
+        )
+
+    return {"name": "synthetic_%dx%d" % (num_helices, helix_length), "vstrands": vstrands}
+
+
+def write_design(filename, **design_params):
+    """Write a synthetic design to a json file"""
+    with open(filename, "w") as design_file:
+        json.dump(make_design(**design_params), design_file)
+
+
+def add_design_arguments(parser):
+    """Add the synthetic design arguments to an argument parser"""
+    parser.add_argument("--length", type=int, default=210, help="Helix length")
+    parser.add_argument(
+        "--staple-length", type=int, default=100, help="Mean staple length"
+    )
+    parser.add_argument(
+        "--staple-length-std", type=int, default=20, help="Staple length deviation"
+    )
+    parser.add_argument(
+        "--crossover-density",
+        type=float,
+        default=1.0,
+        help="Fraction of the staple crossover sites used",
+    )
+    parser.add_argument(
+        "--circular-fraction",
+        type=float,
+        default=0.0,
+        help="Fraction of the staple loops kept circular",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+
+
+def get_design_params(args, num_helices):
+    """Get the synthetic design parameters from parsed arguments"""
+    return {
+        "num_helices": num_helices,
+        "helix_length": args.length,
+        "staple_length": args.staple_length,
+        "staple_length_std": args.staple_length_std,
+        "crossover_density": args.crossover_density,
+        "circular_fraction": args.circular_fraction,
+        "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic cadnano design generator")
+    parser.add_argument("-o", "--output", type=str, required=True, help="Json file")
+    parser.add_argument("--helices", type=int, default=8, help="Number of helices")
+    add_design_arguments(parser)
+    args = parser.parse_args()
+
+    write_design(args.output, **get_design_params(args, args.helices))
+
+
+if __name__ == "__main__":
+    main()
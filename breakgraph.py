@@ -0,0 +1,506 @@
+import heapq
+import logging
+
+import numpy as np
+
+import utilities
+
+
+class BreakGraph:
+    def __init__(self):
+        """
+        Compact array-backed break graph
+
+        Break nodes get integer ids and the break edges are stored in CSR arrays.
+        BreakEdge objects are only made for the edges used by the break solutions.
+        """
+        self.origami = None
+        self.autobreak = None
+
+        # Vectorized edge weight parameter
+        self.vectorized = False
+
+        # Node parameters
+        self.break_nodes = []
+        self.node_oligo = []
+        self.node_position = []
+        self.node_neighbor = None
+        self.node_loop_edge = []
+
+        # Oligo parameters
+        self.oligos = []
+        self.oligo_node_ids = []
+
+        # Edge parameters in CSR format
+        self.edge_indptr = [0]
+        self.edge_src = []
+        self.edge_dst = []
+        self.edge_length = []
+        self.edge_valid = []
+
+        # Sequence dependent edge parameters
+        self.edge_weight = None
+        self.edge_dG = None
+        self.edge_dH = None
+        self.edge_dS = None
+        self.edge_Tf = None
+
+        # Structural edge parameters for the vectorized weights
+        self.edge_loop_dG = []
+        self.edge_loop_dS = []
+
+        # dsDNA segment windows on the scaffold
+        self.segment_edge = []
+        self.segment_start = []
+        self.segment_length = []
+
+        # Break edge objects
+        self.break_edges = {}
+        self.fallback_edges = {}
+
+        # Path entries of the last path search
+        self.path_entries = None
+
+    def initialize(self, autobreak):
+        """Initialize the graph for the autobreak object"""
+        self.autobreak = autobreak
+        self.origami = autobreak.origami
+
+        # Weights can be vectorized only for the dG optimization function
+        self.vectorized = (
+            self.origami.thermo_index is not None
+            and autobreak.optim_args_funcs == ["dG"]
+            and "sum" in autobreak.optim_score_functions
+        )
+
+        if not self.vectorized:
+            logging.warning(
+                "Edge weights can't be vectorized, keeping the break edge objects"
+            )
+
+    def add_oligo(self, oligo):
+        """Add the breaks and break edges of an oligo and release the edge objects"""
+        oligo_index = len(self.oligos)
+        self.oligos.append(oligo)
+
+        # 1. Assign node ids
+        node_ids = []
+        for position, current_break in enumerate(oligo.breaks):
+            current_break.graph_id = len(self.break_nodes)
+            node_ids.append(current_break.graph_id)
+
+            self.break_nodes.append(current_break)
+            self.node_oligo.append(oligo_index)
+            self.node_position.append(position)
+            self.node_loop_edge.append(-1)
+
+        self.oligo_node_ids.append(node_ids)
+
+        # 2. Add the edges
+        for current_break in oligo.breaks:
+            for break_edge in current_break.break_edges:
+                self.add_edge(break_edge)
+
+            self.edge_indptr.append(len(self.edge_src))
+
+            # Release the edge objects
+            current_break.break_edges = None
+            current_break.loop_edge = None
+
+    def add_edge(self, break_edge):
+        """Add a break edge to the edge arrays"""
+        edge_id = len(self.edge_src)
+
+        self.edge_src.append(break_edge.current_break.graph_id)
+        self.edge_dst.append(break_edge.next_break.graph_id)
+        self.edge_length.append(break_edge.edge_length)
+        self.edge_valid.append(break_edge.valid)
+
+        # Loop edges start and end at the same break
+        if break_edge.isloop:
+            self.node_loop_edge[break_edge.current_break.graph_id] = edge_id
+
+        self.edge_loop_dG.append(np.sum(break_edge.dG_inter_list))
+        self.edge_loop_dS.append(np.sum(break_edge.dS_inter_list))
+
+        # Keep the edge object if its weight can't be determined from the segments
+        if not self.vectorized or break_edge.dsDNA_windows is None:
+            break_edge.graph_id = edge_id
+            self.break_edges[edge_id] = break_edge
+            self.fallback_edges[edge_id] = break_edge
+            return
+
+        # Add the dsDNA segment windows
+        start_positions, seq_lengths = break_edge.dsDNA_windows
+        self.segment_edge.extend([edge_id] * len(start_positions))
+        self.segment_start.extend(start_positions)
+        self.segment_length.extend(seq_lengths)
+
+    def finalize(self):
+        """Make the graph arrays"""
+        # Get neighbor ids
+        self.node_neighbor = [
+            (
+                current_break.neighbor_break.graph_id
+                if current_break.neighbor_break
+                and current_break.neighbor_break.graph_id is not None
+                else -1
+            )
+            for current_break in self.break_nodes
+        ]
+        self.node_neighbor_array = np.array(self.node_neighbor, dtype=np.int64)
+
+        # Make the edge arrays
+        self.edge_indptr = np.array(self.edge_indptr, dtype=np.int64)
+        self.edge_src = np.array(self.edge_src, dtype=np.int64)
+        self.edge_dst = np.array(self.edge_dst, dtype=np.int64)
+        self.edge_length = np.array(self.edge_length, dtype=np.int64)
+        self.edge_valid = np.array(self.edge_valid, dtype=bool)
+        self.edge_loop_dG = np.array(self.edge_loop_dG, dtype=float)
+        self.edge_loop_dS = np.array(self.edge_loop_dS, dtype=float)
+
+        # Make the segment arrays
+        self.segment_edge = np.array(self.segment_edge, dtype=np.int64)
+        self.segment_start = np.array(self.segment_start, dtype=np.int64)
+        self.segment_length = np.array(self.segment_length, dtype=np.int64)
+
+        # Get the concentration and RT terms
+        temperature_kelvin = self.autobreak.optim_temperature_kelvin
+        self.dG_conc, self.dS_conc = utilities.conc_to_dG(temperature_kelvin)
+        self.RT = utilities.R * temperature_kelvin
+
+        # Python lists for the path solvers
+        self.edge_indptr_list = self.edge_indptr.tolist()
+        self.edge_dst_list = self.edge_dst.tolist()
+        self.edge_valid_list = self.edge_valid.tolist()
+
+        # Determine the edge weights
+        self.update_weights()
+
+        logging.info(
+            f"Break graph: {len(self.break_nodes)} nodes, {len(self.edge_src)} edges, "
+            f"{len(self.fallback_edges)} edge objects"
+        )
+
+    def get_num_edges(self):
+        """Return number of edges"""
+        return len(self.edge_src)
+
+    def update_weights(self):
+        """Update the sequence dependent edge parameters for the current sequence"""
+        num_edges = self.get_num_edges()
+
+        if self.vectorized:
+            # 1. Determine the intrinsic free energies of the dsDNA segments
+            dH_NN, dS_NN, seq_lengths, _ = self.origami.thermo_index.get_NN_terms(
+                self.segment_start, self.segment_length
+            )
+            dG_segment, dH_segment, dS_segment = utilities.NN_terms_to_dG_dH_dS(
+                dH_NN, dS_NN, seq_lengths, self.autobreak.optim_temperature_kelvin
+            )
+
+            # 2. Get total energies
+            self.edge_dG = (
+                np.bincount(self.segment_edge, dG_segment, num_edges)
+                + self.edge_loop_dG
+                + self.dG_conc
+            )
+            self.edge_dS = (
+                np.bincount(self.segment_edge, dS_segment, num_edges)
+                + self.edge_loop_dS
+                + self.dS_conc
+            )
+            self.edge_dH = np.bincount(self.segment_edge, dH_segment, num_edges)
+
+            # 3. Determine log-probabilities
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                edge_prob = np.exp(-self.edge_dG / self.RT) / (
+                    1.0 + np.exp(-self.edge_dG / self.RT)
+                )
+                self.edge_weight = np.log(edge_prob)
+
+                # 4. Estimate Tf in °C
+                self.edge_Tf = self.edge_dH / self.edge_dS - 273.15
+        else:
+            self.edge_weight = np.zeros(num_edges)
+            self.edge_dG = np.zeros(num_edges)
+            self.edge_dH = np.zeros(num_edges)
+            self.edge_dS = np.zeros(num_edges)
+            self.edge_Tf = np.zeros(num_edges)
+
+        # Update the edge objects
+        for edge_id, break_edge in self.break_edges.items():
+            break_edge.update_sequence()
+
+            # Copy the weights of the edges that are not vectorized
+            if edge_id in self.fallback_edges:
+                self.edge_weight[edge_id] = break_edge.edge_weight
+                self.edge_dG[edge_id] = break_edge.dG_total
+                self.edge_dH[edge_id] = break_edge.dH_total
+                self.edge_dS[edge_id] = break_edge.dS_total
+                self.edge_Tf[edge_id] = break_edge.edge_Tf
+
+        self.edge_weight_list = self.edge_weight.tolist()
+
+    def has_break(self, current_break):
+        """Check if the break node belongs to the graph"""
+        graph_id = current_break.graph_id
+        return (
+            graph_id is not None
+            and graph_id < len(self.break_nodes)
+            and self.break_nodes[graph_id] is current_break
+        )
+
+    def get_break_edge(self, edge_id):
+        """Return the break edge object for an edge id, make it if it doesnt exist"""
+        from autobreak_main import BreakEdge  # Deferred import
+
+        if edge_id in self.break_edges:
+            return self.break_edges[edge_id]
+
+        # Create break
+        new_edge = BreakEdge()
+        new_edge.origami = self.origami
+        new_edge.autobreak = self.autobreak
+        new_edge.edge_length = int(self.edge_length[edge_id])
+        new_edge.graph_id = edge_id
+
+        # Make the connection
+        current_break = self.break_nodes[self.edge_src[edge_id]]
+        next_break = self.break_nodes[self.edge_dst[edge_id]]
+        new_edge.make_connection(current_break, next_break)
+        new_edge.isloop = current_break == next_break
+
+        self.break_edges[edge_id] = new_edge
+
+        return new_edge
+
+    def get_break_edge_between(self, current_break, next_break):
+        """Return the break edge object between two break nodes"""
+        current_id = current_break.graph_id
+        next_id = next_break.graph_id
+
+        for edge_id in range(
+            self.edge_indptr_list[current_id], self.edge_indptr_list[current_id + 1]
+        ):
+            if self.edge_dst_list[edge_id] == next_id:
+                return self.get_break_edge(edge_id)
+
+        return None
+
+    def get_k_best_path_entries(self, start_break, final_break, k_num):
+        """
+        Get the k-best path entries between the start and final break points
+
+        Same forward pass as BreakNode.get_k_best_path_entries on the edge arrays.
+        An entry is (score, path bitset, previous node id, rank of the entry at the
+        previous node, edge id).
+        """
+        start_id = start_break.graph_id
+        final_id = final_break.graph_id
+        oligo_index = self.node_oligo[start_id]
+        oligo = self.oligos[oligo_index]
+        node_ids = self.oligo_node_ids[oligo_index]
+
+        # Get the local order parameters
+        num_nodes = len(node_ids)
+        start_position = self.node_position[start_id]
+        if start_id == final_id:
+            num_steps = num_nodes
+        else:
+            num_steps = (self.node_position[final_id] - start_position) % num_nodes + 1
+
+        # Get the breaks that can't be broken
+        blocked = [
+            current_break.dont_break or current_break.dont_break_temp
+            for current_break in oligo.breaks
+        ]
+
+        # Get the order id bit of the neighbor break for each position, the final
+        # break has no neighbor constraint
+        neighbor_bits = [0] * num_nodes
+        for position, node_id in enumerate(node_ids):
+            neighbor_id = self.node_neighbor[node_id]
+            if (
+                node_id != final_id
+                and neighbor_id >= 0
+                and self.node_oligo[neighbor_id] == oligo_index
+            ):
+                neighbor_bits[position] = 1 << (
+                    (self.node_position[neighbor_id] - start_position) % num_nodes
+                )
+
+        # Get the neighbor bits of the nodes after each order id
+        constraint_bits = [0] * num_steps
+        later_bits = 0
+        for order_id in range(num_steps - 1, -1, -1):
+            constraint_bits[order_id] = later_bits
+            later_bits |= neighbor_bits[(start_position + order_id) % num_nodes]
+
+        # Initialize the path entries, the start break has an empty entry
+        path_entries = {start_id: [(0, 0, -1, -1, -1)]}
+        final_entries = []
+
+        for order_id in range(num_steps):
+            position = (start_position + order_id) % num_nodes
+            node_id = node_ids[position]
+
+            # If current node is final break, quit
+            if node_id == final_id and order_id > 0:
+                break
+
+            # Skip the break nodes that can't be reached or broken
+            if node_id not in path_entries or blocked[position]:
+                continue
+
+            # Keep the k-best entries that the neighbor constraints can't tell apart
+            new_entries = utilities.select_k_best_entries(
+                path_entries[node_id], k_num, constraint_bits[order_id]
+            )
+            path_entries[node_id] = new_entries
+
+            # Get the order id bit of the node
+            break_bit = 1 << order_id
+
+            for edge_id in range(
+                self.edge_indptr_list[node_id], self.edge_indptr_list[node_id + 1]
+            ):
+                next_id = self.edge_dst_list[edge_id]
+                next_position = self.node_position[next_id]
+
+                # Check the edge validity
+                if not self.edge_valid_list[edge_id] or blocked[next_position]:
+                    continue
+
+                # Edges go forward or wrap around to the start of a circular oligo
+                next_order_id = (next_position - start_position) % num_nodes
+                if not (
+                    next_order_id > order_id or (next_order_id == 0 and order_id > 0)
+                ):
+                    continue
+
+                # Wrapping edges of circular oligos arrive at the final break
+                if next_id == start_id:
+                    next_entries = final_entries
+                else:
+                    next_entries = path_entries.setdefault(next_id, [])
+                neighbor_bit = neighbor_bits[next_position]
+
+                edge_weight = self.edge_weight_list[edge_id]
+                for rank, (score, path_bits, _, _, _) in enumerate(new_entries):
+                    # Discard the paths that include the neighbor of the next node
+                    if (path_bits | break_bit) & neighbor_bit:
+                        continue
+
+                    # Determine the new score
+                    if order_id == 0:
+                        new_score = edge_weight
+                    else:
+                        new_score = score + edge_weight
+
+                    next_entries.append(
+                        (new_score, path_bits | break_bit, node_id, rank, edge_id)
+                    )
+
+        # Collect the entries for the final break
+        if start_id != final_id:
+            final_entries = path_entries.get(final_id, [])
+
+        # Finally add the loop connection
+        loop_edge_id = self.node_loop_edge[start_id]
+        if (
+            start_id == final_id
+            and loop_edge_id >= 0
+            and self.edge_valid_list[loop_edge_id]
+            and not blocked[start_position]
+        ):
+            final_entries.append(
+                (self.edge_weight_list[loop_edge_id], 0, start_id, 0, loop_edge_id)
+            )
+
+        # Keep the path entries to make the break solutions
+        self.path_entries = path_entries
+
+        return heapq.nlargest(k_num, final_entries, key=lambda x: x[0])
+
+    def make_break_solution(self, start_break, final_break, path_entry):
+        """Make the break solution for a path entry ending at the final break"""
+        from autobreak_main import BreakPath, OligoBreakSolution  # Deferred import
+
+        start_id = start_break.graph_id
+
+        # Make final node break path object
+        break_paths = [BreakPath(final_break, None, path_entry[0])]
+
+        # Follow the entries back to the start break
+        score, _, previous_id, rank, edge_id = path_entry
+        while previous_id >= 0:
+            break_paths.append(
+                BreakPath(
+                    self.break_nodes[previous_id], self.get_break_edge(edge_id), score
+                )
+            )
+
+            # Stop at the start break
+            if previous_id == start_id:
+                break
+
+            score, _, previous_id, rank, edge_id = self.path_entries[previous_id][rank]
+
+        new_break_solution = OligoBreakSolution()
+        new_break_solution.start_break = start_break
+        new_break_solution.final_break = final_break
+        new_break_solution.break_paths = break_paths
+        new_break_solution.score = path_entry[0]
+        new_break_solution.origami = self.origami
+
+        # Initialize the solution
+        new_break_solution.initialize()
+
+        return new_break_solution
+
+    def calculate_penalty(self, group_solution):
+        """Calculate the penalty for an oligo group solution on the node arrays"""
+        group_solution.total_score = 0
+        group_solution.total_penalty = 0
+        group_solution.total_dsDNA_length = 0
+        group_solution.complete = True
+
+        # Get the node ids of the breaks in the solutions
+        solution_break_ids = {}
+        for key, break_solution in group_solution.break_solutions.items():
+            if break_solution:
+                solution_break_ids[key] = [
+                    current_break.graph_id for current_break in break_solution.breaks
+                ]
+
+        # Mark the broken nodes
+        is_broken = np.zeros(len(self.break_nodes), dtype=bool)
+        for break_ids in solution_break_ids.values():
+            is_broken[break_ids] = True
+
+        # Iterate over each solution
+        for key, break_solution in group_solution.break_solutions.items():
+            # If the solution doesn't exist, move to the next break solution
+            if not break_solution:
+                group_solution.complete = False
+                continue
+
+            # Update total score and dsDNA length
+            group_solution.total_score += break_solution.score
+            group_solution.total_dsDNA_length += break_solution.calculate_dsDNA_length()
+
+            # Find the breaks whose neighbors are broken
+            break_ids = np.array(solution_break_ids[key][:-1], dtype=np.int64)
+            neighbor_ids = self.node_neighbor_array[break_ids]
+            is_bad = (neighbor_ids >= 0) & is_broken[np.maximum(neighbor_ids, 0)]
+
+            break_solution.bad_list = [
+                self.break_nodes[break_id] for break_id in break_ids[is_bad]
+            ]
+
+            # Update total penalty score
+            group_solution.total_penalty += len(break_solution.bad_list)
+
+        # Divide penalty score by 2
+        group_solution.total_penalty = int(group_solution.total_penalty / 2)
@@ -0,0 +1,99 @@
+"""
+Compute-only autobreak entry point
+
+Runs the break optimization on a cadnano design and prints the energy of the best
+solution as json. Only NumPy, cadnano and the solver modules are imported and no
+output files, spreadsheets or figures are made:
+
+    python compute.py -i design.json --sequence p8064 --rule xstap.all3 --nsol 10
+"""
+
+import argparse
+import json
+
+from autobreak_main import GROUP_SOLVERS, DefaultArgs, evaluate, prepare_design
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the break optimization only.")
+
+    parser.add_argument(
+        "-i", "--input", type=str, required=True, help="Input JSON file"
+    )
+    parser.add_argument("--sequence", type=str, default=None, help="Sequence file")
+    parser.add_argument("--rule", type=str, default=DefaultArgs.rule, help="Break rule")
+    parser.add_argument("--score", type=str, default=DefaultArgs.score, help="Score")
+    parser.add_argument(
+        "--func", type=str, default=DefaultArgs.func, help="Optimization function"
+    )
+    parser.add_argument(
+        "--nsol", type=int, default=DefaultArgs.nsol, help="Number of solutions"
+    )
+    parser.add_argument(
+        "--minlength", type=int, default=DefaultArgs.minlength, help="Minimum length"
+    )
+    parser.add_argument(
+        "--maxlength", type=int, default=DefaultArgs.maxlength, help="Maximum length"
+    )
+    parser.add_argument(
+        "--dontbreak", type=int, default=DefaultArgs.dontbreak, help="Dont break"
+    )
+    parser.add_argument("--seed", type=int, default=DefaultArgs.seed, help="Seed")
+    parser.add_argument("--permute", action="store_true", help="Permute sequence")
+    parser.add_argument(
+        "--npermute", type=int, default=1, help="Number of permutations"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=DefaultArgs.jobs, help="Number of processes"
+    )
+    parser.add_argument(
+        "--compact", action="store_true", help="Use compact array break graph"
+    )
+    parser.add_argument(
+        "--group-solver",
+        type=str,
+        default=DefaultArgs.group_solver,
+        choices=GROUP_SOLVERS,
+        help="Oligo group solver",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=DefaultArgs.time_budget,
+        help="Exact group solver time budget per oligo group in seconds",
+    )
+    parser.add_argument(
+        "--cache-dir", type=str, default=None, help="Result cache directory"
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # Prepare the design for the break rule
+    origami = prepare_design(args.input, args.sequence, args.rule)
+
+    # Run the optimization
+    params = vars(args)
+    params.pop("input")
+    params.pop("sequence")
+    energy, timings = evaluate(origami, params)
+
+    best_complete_solution = origami.autobreak.best_complete_solution
+    result = {
+        "energy": float(energy) if energy is not None else None,
+        "sequence_offset": None,
+        "total_score": None,
+        "timings": timings,
+    }
+    if best_complete_solution:
+        result["sequence_offset"] = best_complete_solution.sequence_offset
+        result["total_score"] = float(best_complete_solution.total_score)
+
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
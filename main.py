@@ -12,9 +12,8 @@ import time
 import re
 import shutil
 import threading
-from skopt import gp_minimize
 from skopt.space import Integer, Categorical
-from skopt.utils import use_named_args
+from tuner import Tuner
 import numpy as np
 from PIL import Image, ImageTk
 from PIL import Image, ImageTk
@@ -212,6 +211,7 @@ class OrigamiApp:
         self.root = root
         self.outputFinalFile = ""
         self.initial_energy = None
+        self.tuner = None
 
         self.output_directory = None
         self.input_tail = None
@@ -439,6 +439,7 @@ class OrigamiApp:
         try:
             # logging.info("Starting run_process")
             self.run_button.config(state="disabled")
+            self.start_tuner()
             self.initial_energy = self.calculate_initial_energy()
             self.clear_main_window()
             self.setup_results_window()
@@ -713,6 +714,7 @@ class OrigamiApp:
         if proceed:
             self.run_full_optimization(valid_params)
         else:
+            self.close_tuner()
             self.clear_main_window()
             self.create_widgets()  # Recreate the initial screen
             messagebox.showinfo(
@@ -727,60 +729,90 @@ class OrigamiApp:
             self.end_optimization()
 
     def end_optimization(self):
+        # The optimization thread offers the best finished point when it stops
         self.stop_optimization = True
-        self.root.after(100, self.check_optimization_ended)
 
-    def check_optimization_ended(self):
-        if self.optimization_thread.is_alive():
-            self.root.after(100, self.check_optimization_ended)
+    def finish_ended_optimization(self, best_params, total_optimization_time):
+        if best_params is None:
+            messagebox.showinfo(
+                "Optimization Ended",
+                "The optimization process has been ended by the user.",
+            )
+            self.root.quit()
+        elif messagebox.askyesno(
+            "Optimization Ended",
+            "The optimization process has been ended by the user.\n\n"
+            "Run AutoBreak with the best parameters found so far?",
+        ):
+            self.run_final_autobreak(best_params, total_optimization_time)
         else:
             self.root.quit()
 
     def optimize_parameters(self, space):
         optimization_start_time = time.time()
 
-        @use_named_args(space)
-        def objective(**params):
-            if self.stop_optimization:
-                raise StopIteration("Optimization stopped by user")
-
-            energy, _, _ = self.run_autobreak(params)
-            return energy if energy is not None else 1e10
-
-        try:
-            self.n_calls = 50  # Total number of calls to make
-            result = gp_minimize(
-                objective,
-                space,
-                n_calls=self.n_calls,
-                n_random_starts=10,
-                n_jobs=cpu_count(),
-                callback=self.update_progress,
-            )
-            optimization_end_time = time.time()
-            total_optimization_time = optimization_end_time - optimization_start_time
+        # Ask/tell optimization with one evaluation in flight per worker
+        self.n_calls = 50  # Total number of calls to make
+        result = self.tuner.optimize(
+            space,
+            n_calls=self.n_calls,
+            n_initial_points=10,
+            callback=self.update_progress,
+            should_stop=lambda: self.stop_optimization,
+        )
+        optimization_end_time = time.time()
+        total_optimization_time = optimization_end_time - optimization_start_time
+        self.close_tuner()
 
-            best_params = result.x
+        best_params = result.x if result is not None else None
 
-            # Pass the total optimization time to run_final_autobreak
-            self.root.after(
-                0,
-                lambda: self.run_final_autobreak(best_params, total_optimization_time),
-            )
-        except StopIteration:
+        # Keep the finished evaluations of an ended optimization
+        if self.stop_optimization or result is None:
             self.root.after(
                 0,
-                lambda: messagebox.showinfo(
-                    "Optimization Ended",
-                    "The optimization process has been ended by the user.",
+                lambda: self.finish_ended_optimization(
+                    best_params, total_optimization_time
                 ),
             )
+            return
+
+        # Pass the total optimization time to run_final_autobreak
+        self.root.after(
+            0,
+            lambda: self.run_final_autobreak(best_params, total_optimization_time),
+        )
 
     def update_progress(self, optimization_result):
         progress = (len(optimization_result.x_iters) / self.n_calls) * 100
         self.root.after(0, lambda: self.progress_bar.config(value=progress))
 
+    def start_tuner(self):
+        # Evaluations run in-process in a warm worker pool with the design loaded
+        self.close_tuner()
+        self.tuner = Tuner(self.uploaded_file, "yk_p7560.txt", cpu_count())
+        self.tuner.start()
+
+    def close_tuner(self):
+        if self.tuner is not None:
+            self.tuner.close()
+            self.tuner = None
+
+    def evaluate_autobreak(self, params):
+        start_time = time.time()
+        try:
+            energy, run_time, params = self.tuner.evaluate(params)
+            if energy is not None and not np.isfinite(energy):
+                return 1e10, run_time, params
+            return energy, run_time, params
+        except Exception as e:
+            custom_showerror("Error", f"Error running autobreak: {str(e)}")
+            return 1e10, time.time() - start_time, params
+
     def run_autobreak(self, params, is_final_run=False, is_initial_run=False):
+        # Only the final run writes the output files
+        if not is_final_run and self.tuner is not None:
+            return self.evaluate_autobreak(params)
+
         start_time = time.time()
 
         def safe_convert(param, dtype):
@@ -3,23 +3,40 @@ import math
 import random
 import os
 import sys
+import time
 import numpy as np
-import matplotlib as mpl
-from matplotlib import pyplot as plt
-from fastprogress.fastprogress import master_bar, progress_bar
 import cadnano
 from cadnano.document import Document
-import matplotlib.cm as cm
-import numpy as np
-import matplotlib.colors
-import matplotlib.pyplot as plt
 
 # import autobreak_main
 import scaffolds as scaffolds
+import tracing
 import utilities as utilities
 
 
 class Sequence:
+    __slots__ = (
+        "dna",
+        "next_sequence",
+        "previous_sequence",
+        "scaffoldPos",
+        "direction",
+        "distance",
+        "forward",
+        "idNum",
+        "idx3p",
+        "idx5p",
+        "idxHigh",
+        "idxLow",
+        "length",
+        "origami",
+        "strHigh",
+        "strLow",
+        "strand",
+        "totalLength",
+        "type",
+    )
+
     def __init__(self):
         """DNA sequence class"""
         self.dna = None
@@ -58,7 +75,7 @@ class OligoGroup:
 
     def sort_oligos_by_length(self, reverse=True):
         """Sort oligos by length"""
-        self.oligos.sort(key=lambda x: x.length, reverse=reverse)
+        self.oligos.sort(key=lambda x: (x.length, x.key), reverse=reverse)
 
     def reset_temp_neighbor_constraints(self):
         """Reset temporary neighbor constraints"""
@@ -147,6 +164,12 @@ class OligoGroup:
         oligo_count = len(self.oligos)
         mb.write(f"Processing {oligo_count} oligos per solution.")
 
+        # Path sets of each oligo by its blocked breaks, the edge weights are fixed
+        # within the call. Random path selection samples new paths on every call.
+        path_caches = None
+        if self.origami.autobreak.k_select == "best":
+            path_caches = {}
+
         for i in mb:
             # Reset temporary neighbor constraints
             self.reset_temp_neighbor_constraints()
@@ -173,7 +196,14 @@ class OligoGroup:
                     continue
 
                 # 1. Create shortest paths
-                oligo.generate_shortest_paths(num_oligo_solutions, verbose=verbose)
+                if path_caches is None:
+                    oligo.generate_shortest_paths(num_oligo_solutions, verbose=verbose)
+                else:
+                    oligo.generate_cached_shortest_paths(
+                        path_caches.setdefault(oligo.key, {}),
+                        num_oligo_solutions,
+                        verbose=verbose,
+                    )
 
                 # 2. Remove penalized solutions
                 oligo.remove_penalized_solutions()
@@ -212,6 +242,163 @@ class OligoGroup:
             score = new_group_solution.total_score
             mb.write(f"Finished solution {i}. Score: {score:.5f}")
 
+    def create_exact_oligo_solutions(
+        self, num_candidates=10, time_budget=1.0, verbose=False
+    ):
+        """
+        Create the best conflict free group solution by branch and bound
+
+        Every oligo picks one of its k-best paths and two picks conflict if a break of
+        one is the neighbor of a break of the other. The oligos with fewest candidates
+        are assigned first, the candidates in score order, and a branch is cut when its
+        score plus the best candidate scores of the unassigned oligos can't beat the
+        best solution. The best solution found within the time budget is kept. Returns
+        False if no solution is found.
+        """
+        from autobreak_main import GroupBreaksolution  # Deferred import
+
+        # Initialize group solutions
+        self.group_solutions = []
+        deadline = time.perf_counter() + time_budget
+
+        # 1. Get the candidate paths without neighbor constraints
+        self.reset_temp_neighbor_constraints()
+        oligos = []
+        candidate_lists = []
+        for oligo in self.oligos:
+            # If oligo has dont break flag, skip
+            if oligo.dont_break:
+                continue
+
+            candidates = oligo.get_candidate_solutions(num_candidates, verbose=verbose)
+            if not candidates:
+                return False
+
+            # Keep the breaks and the neighbor breaks of each candidate
+            candidates.sort(key=lambda x: x.score, reverse=True)
+            oligos.append(oligo)
+            candidate_lists.append(
+                [
+                    (
+                        candidate,
+                        frozenset(candidate.breaks),
+                        frozenset(
+                            new_break.neighbor_break
+                            for new_break in candidate.breaks[:-1]
+                            if new_break.neighbor_break
+                        ),
+                    )
+                    for candidate in candidates
+                ]
+            )
+
+        # 2. Assign the oligos with fewest candidates first
+        order = sorted(
+            range(len(oligos)),
+            key=lambda x: (len(candidate_lists[x]), oligos[x].key),
+        )
+        oligos = [oligos[index] for index in order]
+        candidate_lists = [candidate_lists[index] for index in order]
+
+        # Best score of the unassigned oligos at each depth
+        num_oligos = len(oligos)
+        bounds = [0.0] * (num_oligos + 1)
+        for depth in range(num_oligos - 1, -1, -1):
+            bounds[depth] = bounds[depth + 1] + candidate_lists[depth][0][0].score
+
+        # 3. Search the assignments depth first
+        used_breaks = {}
+        blocked_breaks = {}
+        best_score = -math.inf
+        best_choices = [] if num_oligos == 0 else None
+        choices = [-1] * num_oligos
+        score = 0.0
+        depth = 0 if num_oligos > 0 else -1
+        num_nodes = 0
+        while depth >= 0:
+            # Remove the candidate picked at this depth
+            if choices[depth] >= 0:
+                candidate, breaks, neighbor_breaks = candidate_lists[depth][
+                    choices[depth]
+                ]
+                score -= candidate.score
+                self.remove_break_counts(used_breaks, breaks)
+                self.remove_break_counts(blocked_breaks, neighbor_breaks)
+            choices[depth] += 1
+
+            # Stop at the time budget
+            num_nodes += 1
+            if num_nodes % 256 == 0 and time.perf_counter() > deadline:
+                tracing.info(
+                    "Oligo group %s search stopped after %d nodes", self.key, num_nodes
+                )
+                break
+
+            # Pick the next candidate that can beat the best solution without conflicts
+            picked = False
+            candidate_list = candidate_lists[depth]
+            while choices[depth] < len(candidate_list):
+                candidate, breaks, neighbor_breaks = candidate_list[choices[depth]]
+                if score + candidate.score + bounds[depth + 1] <= best_score:
+                    break
+                if not (
+                    any(new_break in blocked_breaks for new_break in breaks)
+                    or any(new_break in used_breaks for new_break in neighbor_breaks)
+                ):
+                    picked = True
+                    break
+                choices[depth] += 1
+
+            # Go back to the previous oligo
+            if not picked:
+                choices[depth] = -1
+                depth -= 1
+                continue
+
+            score += candidate.score
+            self.add_break_counts(used_breaks, breaks)
+            self.add_break_counts(blocked_breaks, neighbor_breaks)
+
+            # Keep a complete assignment, else go to the next oligo
+            if depth == num_oligos - 1:
+                best_score = score
+                best_choices = list(choices)
+            else:
+                depth += 1
+
+        if best_choices is None:
+            return False
+
+        # 4. Make the group solution
+        new_group_solution = GroupBreaksolution()
+        new_group_solution.break_solutions = {}
+        new_group_solution.origami = self.origami
+        for oligo, candidate_list, choice in zip(oligos, candidate_lists, best_choices):
+            new_group_solution.break_solutions[oligo.key] = candidate_list[choice][0]
+
+        # Calculate the penalties for the group solution
+        new_group_solution.calculate_penalty()
+
+        # Print new group solution
+        if verbose:
+            new_group_solution.print_solution()
+
+        self.group_solutions.append(new_group_solution)
+        return True
+
+    def add_break_counts(self, break_counts, breaks):
+        """Count the breaks in a break count map"""
+        for new_break in breaks:
+            break_counts[new_break] = break_counts.get(new_break, 0) + 1
+
+    def remove_break_counts(self, break_counts, breaks):
+        """Remove the breaks from a break count map"""
+        for new_break in breaks:
+            if break_counts[new_break] == 1:
+                del break_counts[new_break]
+            else:
+                break_counts[new_break] -= 1
+
     def sort_solutions(self, filter_incomplete=True):
         """Sort solutions based on the penalty score"""
         # 1. Filter incomplete solutions
@@ -245,6 +432,16 @@ class OligoGroup:
 
 
 class Nucleotide:
+    __slots__ = (
+        "vh",
+        "idx",
+        "direction",
+        "key",
+        "dsDNA",
+        "next_nucleotide",
+        "previous_nucleotide",
+    )
+
     def __init__(self):
         """Nucleotide class"""
         self.vh = None
@@ -258,6 +455,40 @@ class Nucleotide:
 
 
 class Strand:
+    __slots__ = (
+        "origami",
+        "sequences",
+        "next_strand",
+        "oligo",
+        "length",
+        "final_strand",
+        "fwd_breaks",
+        "rev_breaks",
+        "all_breaks",
+        "all_breaks_adjusted",
+        "break_rule",
+        "cadnano_strand",
+        "complement_strands",
+        "direction",
+        "distance",
+        "forward",
+        "idx3p",
+        "idx5p",
+        "idxHigh",
+        "idxLow",
+        "inserts",
+        "totalLength",
+        "vh",
+        "dna",
+        "null_sequence",
+        "scaffoldPos",
+        "sequence_idxLows",
+    )
+
+    # Long strand break parameters
+    LONG_STRAND_LENGTH = 21
+    LONG_STRAND_STEP = 7
+
     def __init__(self):
         """Strand class"""
         self.origami = None
@@ -273,8 +504,6 @@ class Strand:
 
         # Break rule
         self.break_rule = ["xstap", "all3"]
-        self.LONG_STRAND_LENGTH = 21
-        self.LONG_STRAND_STEP = 7
 
     def get_inserts(self, idx_a, idx_b):
         """Get inserts between two idx values on a strand"""
@@ -504,6 +733,8 @@ class Oligo:
 
     def color_by_csv_param(self, param="Tf", color_map="bwr"):
         """Color by csv param"""
+        import matplotlib.colors  # Deferred import
+        from matplotlib import pyplot as plt  # Deferred import
 
         # Prepare the color map
         cmap = plt.get_cmap(color_map, 1000)
@@ -522,6 +753,8 @@ class Oligo:
 
     def color_by_folding_prob(self, color_map="bwr"):
         """Color by the segments"""
+        import matplotlib.colors  # Deferred import
+        from matplotlib import pyplot as plt  # Deferred import
 
         # Prepare the color map
         cmap = plt.get_cmap(color_map, 1000).reversed()
@@ -539,24 +772,8 @@ class Oligo:
         self.cadnano_oligo.applyColor(self.hexcolor)
 
     def get_TfColor(self, Tf, min_Tf=30, max_Tf=70):
-        cmap = plt.get_cmap("coolwarm", max_Tf - min_Tf + 1)
-
-        # Reverse the colormap
-        reversed_cmap = cmap.reversed()
-
-        # Get color index
-        if Tf <= min_Tf:
-            cmap_index = 0
-        elif Tf >= max_Tf:
-            cmap_index = max_Tf - min_Tf
-        else:
-            cmap_index = int(Tf - min_Tf)
-
-        # Get RGB value
-        self.rgb = reversed_cmap(cmap_index)[:3]
-
-        # Get hex-color
-        hexcolor = matplotlib.colors.rgb2hex(self.rgb)
+        # Get RGB value and hex-color
+        self.rgb, hexcolor = utilities.get_Tf_color(Tf, min_Tf, max_Tf)
         return hexcolor
 
     def color_by_Tf(self):
@@ -644,10 +861,9 @@ class Oligo:
         self.break_solutions = []
 
         if self.circular:
-            for current_break in self.breaks:
-                if current_break.dont_break or current_break.dont_break_temp:
-                    continue
-
+            # Any cycle has a break within the upper bound of every break, so it is
+            # enough to start from the breaks in the smallest such window
+            for current_break in self.get_circular_start_breaks():
                 self.reset_break_paths()
                 self.reset_break_order_ids(current_break, current_break)
                 shortest_k_paths = current_break.get_k_shortest_paths(
@@ -660,6 +876,9 @@ class Oligo:
                         f"No shortest paths found for break {current_break.key}"
                     )
 
+            # Remove the rotations of the same solutions
+            self.remove_duplicate_solutions()
+
         else:
             self.reset_break_paths()
             self.reset_break_order_ids(self.start_break, self.final_break)
@@ -677,10 +896,129 @@ class Oligo:
         for break_solution in self.break_solutions:
             break_solution.calculate_self_penalty()
 
+    def get_candidate_solutions(self, num_candidates=10, verbose=False):
+        """Get the k-best penalty free break solutions for the group solver"""
+        num_solutions_per_oligo = self.num_solutions_per_oligo
+        self.num_solutions_per_oligo = num_candidates
+        try:
+            self.generate_shortest_paths(verbose=verbose)
+        finally:
+            self.num_solutions_per_oligo = num_solutions_per_oligo
+
+        # Remove penalized solutions
+        self.remove_penalized_solutions()
+
+        return self.break_solutions
+
+    def get_blocked_breaks(self):
+        """Get the breaks blocked by temporary neighbor constraints"""
+        return frozenset(
+            current_break
+            for current_break in self.breaks
+            if current_break.dont_break_temp
+        )
+
+    def generate_cached_shortest_paths(
+        self, path_cache, num_solutions=1, verbose=False
+    ):
+        """
+        Get the shortest paths for the oligo, reusing the path sets in the path cache
+
+        The path cache maps the blocked breaks of the oligo to its path set. Blocking
+        more breaks only removes paths, so the k-best paths of fewer blocked breaks are
+        still the k-best paths if none of them has a newly blocked break. Circular
+        oligos search from windows that depend on the blocked breaks and are only
+        reused for the same blocked breaks.
+        """
+        blocked_breaks = self.get_blocked_breaks()
+
+        # 1. Reuse the path set of the same blocked breaks
+        break_solutions = path_cache.get(blocked_breaks)
+
+        # 2. Reuse a path set of fewer blocked breaks that avoids the new ones
+        if break_solutions is None and not self.circular:
+            for cached_breaks, cached_solutions in path_cache.items():
+                if cached_breaks <= blocked_breaks and self.avoids_breaks(
+                    cached_solutions, blocked_breaks - cached_breaks
+                ):
+                    break_solutions = cached_solutions
+                    break
+
+        # 3. Solve the paths
+        if break_solutions is None:
+            self.generate_shortest_paths(num_solutions, verbose=verbose)
+            break_solutions = self.break_solutions
+
+        path_cache[blocked_breaks] = break_solutions
+        self.break_solutions = list(break_solutions)
+
+    def avoids_breaks(self, break_solutions, breaks):
+        """Check if none of the break solutions goes through the breaks"""
+        for break_solution in break_solutions:
+            for current_break in break_solution.breaks:
+                if current_break in breaks:
+                    return False
+        return True
+
     def reset_break_paths(self):
         for current_break in self.breaks:
             current_break.reset_break_path()
 
+    def get_circular_start_breaks(self):
+        """
+        Get the start breaks for a circular oligo
+
+        Consecutive breaks of a solution are at most upper bound apart, so every
+        solution includes a break from the window of breakable breaks that starts at
+        any reference break. Returns the smallest such window.
+        """
+        upper_bound = self.origami.autobreak.UPPER_BOUND
+
+        start_breaks = None
+        for reference_break in self.breaks:
+            break_window = self.get_break_window(reference_break, upper_bound)
+
+            if start_breaks is None or len(break_window) < len(start_breaks):
+                start_breaks = break_window
+
+        return start_breaks or []
+
+    def get_break_window(self, reference_break, max_distance):
+        """Get the breakable breaks within max distance from the reference break"""
+        break_window = []
+
+        current_break = reference_break
+        while current_break:
+            # Add the break if it can be broken
+            if not (current_break.dont_break or current_break.dont_break_temp):
+                break_window.append(current_break)
+
+            # Update current break
+            current_break = current_break.next_break
+
+            # Stop if the window completes the loop or exceeds the max distance
+            if current_break == reference_break:
+                break
+            if reference_break.get_break_distance(current_break) > max_distance:
+                break
+
+        return break_window
+
+    def remove_duplicate_solutions(self):
+        """Remove solutions with the same set of breaks"""
+        break_sets = set()
+        unique_solutions = []
+
+        for break_solution in self.break_solutions:
+            break_set = frozenset(break_solution.breaks)
+
+            # Keep the first rotation of each solution
+            if break_set not in break_sets:
+                break_sets.add(break_set)
+                unique_solutions.append(break_solution)
+
+        self.break_solutions = unique_solutions
+
 
 class Crossover:
     def __init__(self):
@@ -702,6 +1040,7 @@ class Origami:
         self.oligos = {"scaffold": [], "staple": []}
         self.oligo_map = {}
         self.break_edge_map = {}
+        self.break_graph = None
         self.oligo_groups = None
 
         self.cadnano_oligos = None
@@ -720,10 +1059,14 @@ class Origami:
 
         # DNA Sequence parameters
         self.sequence_offset = None
+        self.prepared_sequence_offset = None
         self.corrected_offset = 0
         self.sequence_start_pos = None
         self.current_start_pos = None
 
+        # Prefix-sum thermodynamic index for the applied scaffold sequence
+        self.thermo_index = None
+
         # tqdm output file
         self.tqdm_output_file = None
         self.std_output_file = None
@@ -850,6 +1193,23 @@ class Origami:
             if oligo.length < maximum_length:
                 oligo.dont_break = True
 
+    def reset_dont_break_oligos(self):
+        """Reset dont break oligos"""
+        for oligo in self.oligos["staple"]:
+            oligo.dont_break = False
+
+    def reset_sequence_offset(self):
+        """Reapply the sequence offset the origami was prepared with"""
+        if self.sequence_offset == self.prepared_sequence_offset:
+            return
+
+        # Apply the offset and shift sequence
+        self.apply_sequence(self.prepared_sequence_offset)
+
+        # Update strand and sequence dna
+        self.assign_strands_dna()
+        self.update_sequences_dna()
+
     def set_sequence_offset(self):
         """
         Set sequence offset based on the difference between
@@ -2184,6 +2544,26 @@ class Origami:
                 self.scaffold_sequence[offset:] + self.scaffold_sequence[:offset]
             )
 
+            # Build the thermodynamic index for the applied sequence
+            self.build_thermo_index()
+
+    def build_thermo_index(self):
+        """Build prefix-sum thermodynamic index over the applied scaffold sequence"""
+        offset = self.sequence_offset
+        scaffold_length = self.scaffolds[0].length()
+        applied_sequence = (
+            self.scaffold_sequence[offset:] + self.scaffold_sequence[:offset]
+        )[:scaffold_length]
+
+        # If the sequence doesnt cover the whole scaffold, fall back to string scoring
+        if len(applied_sequence) < scaffold_length:
+            self.thermo_index = None
+            return
+
+        self.thermo_index = utilities.SequenceThermoIndex(
+            applied_sequence, circular=self.scaffolds[0].isCircular()
+        )
+
     def get_coordinates(self, vh, index):
         """
         Given a vh and a index, returns (x,y,z)
@@ -0,0 +1,197 @@
+"""
+Phase profiler for the autobreak pipeline
+
+The profiler wraps methods in place and records wall time, CPU time and call counts
+per name. Phases also record the peak RSS of the process after the phase and how much
+the phase raised it, where the resource module exists (not on Windows). The wrappers
+are removed again with restore, so the methods run unchanged when profiling is off.
+
+Only the calls made in the profiling process are counted. Work done in the worker
+processes of the permutation loop shows up as the wall time of the calling phase.
+"""
+
+import functools
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def get_peak_rss_mb():
+    """Get the peak resident set size of the process in MB, None if unavailable"""
+    if resource is None:
+        return None
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak_rss / 1024.0**2
+    return peak_rss / 1024.0
+
+
+class PhaseStats:
+    __slots__ = ("kind", "calls", "wall_time", "cpu_time", "peak_rss", "rss_increase")
+
+    def __init__(self, kind):
+        """Timing statistics of a phase or function"""
+        self.kind = kind
+        self.calls = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+
+        # Memory statistics in MB, phases only
+        self.peak_rss = None
+        self.rss_increase = None
+
+    def to_dict(self):
+        """Return the statistics as a dictionary"""
+        return {
+            "kind": self.kind,
+            "calls": self.calls,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "peak_rss_mb": self.peak_rss,
+            "rss_increase_mb": self.rss_increase,
+        }
+
+
+class PhaseProfiler:
+    def __init__(self):
+        """Phase and hot function profiler"""
+        self.stats = {}
+
+        # Wrapped methods as (owner, attribute name, original attribute)
+        self.wrapped = []
+
+        # Profile start time
+        self.start_time = time.perf_counter()
+
+    def get_stats(self, name, kind):
+        """Get the statistics of a name, create them on first use"""
+        if name not in self.stats:
+            self.stats[name] = PhaseStats(kind)
+        return self.stats[name]
+
+    def wrap_phase(self, func, name):
+        """Wrap a function as a pipeline phase"""
+        stats = self.get_stats(name, "phase")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start_rss = get_peak_rss_mb()
+            start_wall = time.perf_counter()
+            start_cpu = time.process_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.calls += 1
+                stats.wall_time += time.perf_counter() - start_wall
+                stats.cpu_time += time.process_time() - start_cpu
+
+                # Record the peak memory after the phase
+                stats.peak_rss = get_peak_rss_mb()
+                if stats.peak_rss is not None:
+                    stats.rss_increase = (stats.rss_increase or 0.0) + (
+                        stats.peak_rss - start_rss
+                    )
+
+        return wrapper
+
+    def wrap_function(self, func, name):
+        """Wrap a hot function, only the times and the calls are recorded"""
+        stats = self.get_stats(name, "function")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start_wall = time.perf_counter()
+            start_cpu = time.process_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.calls += 1
+                stats.wall_time += time.perf_counter() - start_wall
+                stats.cpu_time += time.process_time() - start_cpu
+
+        return wrapper
+
+    def instrument(self, owner, method_names, kind="phase"):
+        """
+        Wrap methods of a class or an object
+
+        Methods of an object are wrapped on the object, methods of a class are wrapped
+        on the class so every instance is profiled. The stats are named Owner.method.
+        """
+        owner_name = owner.__name__ if isinstance(owner, type) else type(owner).__name__
+        wrap = self.wrap_phase if kind == "phase" else self.wrap_function
+
+        for method_name in method_names:
+            # Keep the class attribute for the class, the bound method for an object
+            if isinstance(owner, type):
+                original = owner.__dict__[method_name]
+            else:
+                original = owner.__dict__.get(method_name)
+
+            method = getattr(owner, method_name)
+            setattr(owner, method_name, wrap(method, owner_name + "." + method_name))
+            self.wrapped.append((owner, method_name, original))
+
+    def restore(self):
+        """Remove the wrappers"""
+        for owner, method_name, original in reversed(self.wrapped):
+            if original is None:
+                delattr(owner, method_name)
+            else:
+                setattr(owner, method_name, original)
+        self.wrapped = []
+
+    def to_dict(self):
+        """Return the profile as a dictionary"""
+        return {
+            "total_time": time.perf_counter() - self.start_time,
+            "peak_rss_mb": get_peak_rss_mb(),
+            "stats": {name: stats.to_dict() for name, stats in self.stats.items()},
+        }
+
+    def write_json(self, filename):
+        """Write the profile to a json file"""
+        with open(filename, "w") as profile_file:
+            json.dump(self.to_dict(), profile_file, indent=2)
+
+    def print_summary(self):
+        """Print the profile table, sorted by wall time"""
+        profile = self.to_dict()
+
+        print(
+            "%-52s %-8s %10s %10s %10s %10s"
+            % ("Name", "Kind", "Calls", "Wall (s)", "CPU (s)", "Peak (MB)")
+        )
+        for name, stats in sorted(
+            profile["stats"].items(), key=lambda item: -item[1]["wall_time"]
+        ):
+            if stats["calls"] == 0:
+                continue
+            peak_rss = stats["peak_rss_mb"]
+            print(
+                "%-52s %-8s %10d %10.3f %10.3f %10s"
+                % (
+                    name,
+                    stats["kind"],
+                    stats["calls"],
+                    stats["wall_time"],
+                    stats["cpu_time"],
+                    "%.1f" % peak_rss if peak_rss is not None else "-",
+                )
+            )
+        peak_rss = profile["peak_rss_mb"]
+        print(
+            "Total time: %.3f s Peak RSS: %s MB"
+            % (
+                profile["total_time"],
+                "%.1f" % peak_rss if peak_rss is not None else "-",
+            )
+        )
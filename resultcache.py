@@ -0,0 +1,121 @@
+"""
+Content-addressed on-disk cache for autobreak results
+
+Entries are gzip compressed pickles stored under the hash of their key, the key
+holds everything that determines the result (design, sequence, parameters, offset).
+"""
+
+import gzip
+import hashlib
+import os
+import pickle
+import time
+
+# Version of the cached entries, increase it when the solvers change their results
+CACHE_VERSION = 1
+
+# Cache file extension
+CACHE_EXTENSION = ".pkl.gz"
+
+
+class ResultCache:
+    def __init__(self, cache_dir, max_size=None, max_age=None):
+        """Result cache directory"""
+        self.cache_dir = cache_dir
+
+        # Eviction limits in bytes and seconds, None for no limit
+        self.max_size = max_size
+        self.max_age = max_age
+
+        # Cache statistics
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_key(self, *key_parts):
+        """Get the cache key for the key parts"""
+        key_hash = hashlib.sha1(repr((CACHE_VERSION,) + key_parts).encode())
+        return key_hash.hexdigest()
+
+    def get_path(self, key):
+        """Get the file path of a cache key"""
+        return os.path.join(self.cache_dir, key[:2], key + CACHE_EXTENSION)
+
+    def load(self, key):
+        """Load a cache entry, return hit and the cached value"""
+        path = self.get_path(key)
+        try:
+            with gzip.open(path, "rb") as cache_file:
+                value = pickle.load(cache_file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return False, None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return True, value
+
+    def store(self, key, value):
+        """Store a cache entry"""
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see partial entries
+        temp_path = "%s.%d.tmp" % (path, os.getpid())
+        with gzip.open(temp_path, "wb") as cache_file:
+            pickle.dump(value, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    def get_entries(self):
+        """Get the cache entries as (last use time, size, path)"""
+        entries = []
+        for root, dirs, files in os.walk(self.cache_dir):
+            for filename in files:
+                if not filename.endswith(CACHE_EXTENSION):
+                    continue
+
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        return entries
+
+    def evict(self):
+        """Evict entries older than max age, then the least recently used above max size"""
+        if self.max_size is None and self.max_age is None:
+            return
+
+        entries = sorted(self.get_entries())
+
+        # 1. Remove the entries older than max age
+        if self.max_age is not None:
+            min_time = time.time() - self.max_age
+            for entry in entries:
+                if entry[0] < min_time:
+                    self.remove(entry[2])
+            entries = [entry for entry in entries if entry[0] >= min_time]
+
+        # 2. Remove the least recently used entries until the cache fits
+        if self.max_size is not None:
+            total_size = sum(entry[1] for entry in entries)
+            for entry in entries:
+                if total_size <= self.max_size:
+                    break
+                self.remove(entry[2])
+                total_size -= entry[1]
+
+    def remove(self, path):
+        """Remove a cache file"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
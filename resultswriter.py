@@ -0,0 +1,189 @@
+"""
+Streaming writer for the autobreak results workbook
+
+The sequence offset sheets are appended to two csv files while the permutation loop
+runs, one row per staple and one row per summary value, keyed by the sequence offset.
+The other sheets are kept in memory as cell grids, writes to them overlay the previous
+cells like DataFrame.to_excel in overlay mode. close builds the xlsx once, in openpyxl
+write-only mode, streaming the offset sheets back from the csv files.
+
+The color column of the in-memory sheets is colored while the xlsx is written: a sheet
+whose first row holds the color column name gets the cells below filled with the hex
+color they hold, with the (fill, font) style taken from the color style function.
+"""
+
+import csv
+import itertools
+
+
+# First row of the staples in the sequence offset sheets
+OFFSET_STAPLES_ROW = 10
+
+
+class ResultsWriter:
+    def __init__(self, excel_file, stream_prefix, color_column=None, color_style=None):
+        """Results workbook writer"""
+        self.excel_file = excel_file
+
+        # Heatmap color column and the function returning the style of a color
+        self.color_column = color_column
+        self.color_style = color_style
+
+        # Stream files of the sequence offset sheets
+        self.staples_stream_file = stream_prefix + "_staples.csv"
+        self.summary_stream_file = stream_prefix + "_summary.csv"
+        self.staples_stream = None
+        self.summary_stream = None
+
+        # Sheet names in workbook order
+        self.sheet_names = []
+
+        # Cell grids of the in-memory sheets as {row: {column: value}}
+        self.sheets = {}
+
+        # Names of the streamed sheets
+        self.stream_sheets = set()
+
+        self.add_sheet("Summary")
+
+    def add_sheet(self, sheet_name):
+        """Add an in-memory sheet if it doesn't exist"""
+        if sheet_name in self.sheets or sheet_name in self.stream_sheets:
+            return
+
+        self.sheet_names.append(sheet_name)
+        self.sheets[sheet_name] = {}
+
+    def write_rows(self, sheet_name, rows, header=None, startrow=0):
+        """Write rows to an in-memory sheet, overlaying the existing cells"""
+        self.add_sheet(sheet_name)
+        sheet = self.sheets[sheet_name]
+
+        if header is not None:
+            rows = [header] + list(rows)
+
+        row_index = startrow
+        for row in rows:
+            sheet.setdefault(row_index, {}).update(enumerate(row))
+            row_index += 1
+
+    def open_streams(self, header):
+        """Open the stream files and write the column headers"""
+        self.staples_stream = open(self.staples_stream_file, "w", newline="")
+        self.summary_stream = open(self.summary_stream_file, "w", newline="")
+
+        csv.writer(self.staples_stream).writerow(["SequenceOffset"] + list(header))
+        csv.writer(self.summary_stream).writerow(["SequenceOffset", "Name", "Value"])
+
+    def write_offset_sheet(self, sheet_name, summary_rows, header, rows):
+        """Append a sequence offset sheet to the stream files"""
+        if self.staples_stream is None:
+            self.open_streams(header)
+
+        self.sheet_names.append(sheet_name)
+        self.stream_sheets.add(sheet_name)
+
+        csv.writer(self.summary_stream).writerows(
+            [sheet_name] + list(row) for row in summary_rows
+        )
+        csv.writer(self.staples_stream).writerows(
+            [sheet_name] + list(row) for row in rows
+        )
+
+        # Keep the finished offsets on disk
+        self.summary_stream.flush()
+        self.staples_stream.flush()
+
+    def read_stream(self, filename):
+        """Read a stream file grouped by sheet name, return the header and the groups"""
+        stream_file = open(filename, newline="")
+        reader = csv.reader(stream_file)
+        header = next(reader)[1:]
+        groups = itertools.groupby(reader, key=lambda row: row[0])
+        return stream_file, header, groups
+
+    def write_grid_sheet(self, sheet, sheet_name):
+        """Write an in-memory sheet"""
+        grid = self.sheets[sheet_name]
+        num_rows = max(grid) + 1 if grid else 0
+
+        # Find the color column in the first row
+        color_index = None
+        if self.color_column is not None:
+            for column, value in grid.get(0, {}).items():
+                if value == self.color_column:
+                    color_index = column
+                    break
+
+        for row_index in range(num_rows):
+            cells = grid.get(row_index, {})
+            num_columns = max(cells) + 1 if cells else 0
+            row = [cells.get(column) for column in range(num_columns)]
+
+            # Color the cells that hold a color
+            if row_index > 0 and color_index is not None and cells.get(color_index):
+                row[color_index] = self.make_color_cell(sheet, row[color_index])
+
+            sheet.append(row)
+
+    def make_color_cell(self, sheet, hex_color):
+        """Make a write-only cell filled with its hex color"""
+        from openpyxl.cell import WriteOnlyCell  # Deferred import
+
+        cell = WriteOnlyCell(sheet, value=hex_color)
+        cell.fill, cell.font = self.color_style(hex_color)
+        return cell
+
+    def write_stream_sheet(self, sheet, summary_group, staples_group, header):
+        """Write a sequence offset sheet from the stream files"""
+        num_rows = 0
+        for row in summary_group:
+            sheet.append(row[1:])
+            num_rows += 1
+
+        # Pad to the staples row
+        for row_index in range(num_rows, OFFSET_STAPLES_ROW):
+            sheet.append([])
+
+        sheet.append(header)
+        for row in staples_group:
+            sheet.append(row[1:])
+
+    def close(self):
+        """Build the results workbook"""
+        import openpyxl  # Deferred import
+
+        workbook = openpyxl.Workbook(write_only=True)
+
+        # Open the offset sheet streams
+        summary_file = staples_file = None
+        if self.staples_stream is not None:
+            self.staples_stream.close()
+            self.summary_stream.close()
+            self.staples_stream = self.summary_stream = None
+
+            summary_file, summary_header, summary_groups = self.read_stream(
+                self.summary_stream_file
+            )
+            staples_file, staples_header, staples_groups = self.read_stream(
+                self.staples_stream_file
+            )
+
+        try:
+            for sheet_name in self.sheet_names:
+                sheet = workbook.create_sheet(str(sheet_name))
+                if sheet_name in self.stream_sheets:
+                    # The offset sheets are streamed in the order they were written
+                    summary_name, summary_group = next(summary_groups)
+                    staples_name, staples_group = next(staples_groups)
+                    self.write_stream_sheet(
+                        sheet, summary_group, staples_group, staples_header
+                    )
+                else:
+                    self.write_grid_sheet(sheet, sheet_name)
+
+            workbook.save(self.excel_file)
+        finally:
+            if summary_file is not None:
+                summary_file.close()
+                staples_file.close()
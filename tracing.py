@@ -0,0 +1,124 @@
+"""
+Level gated trace facility for the autobreak hot paths
+
+Trace calls pass the message format and its arguments separately, the message is only
+formatted when the global trace level enables it. The hottest loops check the level
+before calling trace, so with the default OFF level a trace point costs one global
+comparison. The traces go to the trace logger, and optionally to a binary ring buffer
+that keeps the last records in memory for post-mortem debugging.
+
+Ring buffer records are packed as
+
+    <timestamp:float64> <level:uint8> <message length:uint16> <message:utf-8>
+"""
+
+import collections
+import logging
+import struct
+import time
+
+# Trace levels
+OFF = 0
+INFO = 1
+DEBUG = 2
+
+# Trace level names for the command line
+LEVEL_NAMES = {"off": OFF, "info": INFO, "debug": DEBUG}
+
+# Logging levels of the trace levels
+LOGGING_LEVELS = {INFO: logging.INFO, DEBUG: logging.DEBUG}
+
+# Global trace level
+LEVEL = OFF
+
+# Trace logger, None to keep the traces in the ring buffer only
+LOGGER = None
+
+# Binary ring buffer sink
+RING_BUFFER = None
+
+# Ring buffer record header
+RECORD_HEADER = struct.Struct("<dBH")
+
+# Maximum message length of a ring buffer record
+MAX_MESSAGE_LENGTH = 65535
+
+
+class RingBuffer:
+    def __init__(self, capacity=100000):
+        """Binary ring buffer of the last trace records"""
+        self.records = collections.deque(maxlen=capacity)
+
+    def append(self, level, message):
+        """Pack and append a trace record"""
+        message_bytes = message.encode("utf-8", "replace")[:MAX_MESSAGE_LENGTH]
+        header = RECORD_HEADER.pack(time.time(), level, len(message_bytes))
+        self.records.append(header + message_bytes)
+
+    def dump(self, filename):
+        """Write the records to a binary file"""
+        with open(filename, "wb") as dump_file:
+            for record in self.records:
+                dump_file.write(record)
+
+
+def read_ring_buffer(filename):
+    """Read a ring buffer dump, return a list of (timestamp, level, message)"""
+    with open(filename, "rb") as dump_file:
+        data = dump_file.read()
+
+    records = []
+    position = 0
+    while position + RECORD_HEADER.size <= len(data):
+        timestamp, level, length = RECORD_HEADER.unpack_from(data, position)
+        position += RECORD_HEADER.size
+        message = data[position : position + length].decode("utf-8", "replace")
+        position += length
+        records.append((timestamp, level, message))
+
+    return records
+
+
+def configure(level=OFF, logger=None, ring_buffer_size=0):
+    """Set the trace level and the trace sinks"""
+    global LEVEL, LOGGER, RING_BUFFER
+
+    LEVEL = LEVEL_NAMES[level] if isinstance(level, str) else level
+    LOGGER = logger
+    RING_BUFFER = RingBuffer(ring_buffer_size) if ring_buffer_size > 0 else None
+
+    # Nothing to trace without a sink
+    if LOGGER is None and RING_BUFFER is None:
+        LEVEL = OFF
+
+
+def dump(filename):
+    """Write the ring buffer to a binary file"""
+    if RING_BUFFER is not None:
+        RING_BUFFER.dump(filename)
+
+
+def trace(level, message, *args):
+    """Emit a trace message, formatted only when the trace level enables it"""
+    if level > LEVEL:
+        return
+
+    if args:
+        message = message % args
+
+    if RING_BUFFER is not None:
+        RING_BUFFER.append(level, message)
+    if LOGGER is not None:
+        LOGGER.log(LOGGING_LEVELS[level], message)
+
+
+def info(message, *args):
+    """Emit an info trace message"""
+    if INFO <= LEVEL:
+        trace(INFO, message, *args)
+
+
+def debug(message, *args):
+    """Emit a debug trace message"""
+    if DEBUG <= LEVEL:
+        trace(DEBUG, message, *args)
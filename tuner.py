@@ -0,0 +1,327 @@
+"""
+In-process autobreak evaluations for the parameter tuner
+
+The evaluations run in a pool of worker processes that stay alive for the whole
+optimization. Each worker keeps its prepared designs in memory, keyed by the design
+hash and the break rule. The break edges are kept for the widest length window seen,
+so most evaluations only mask the edges by length and rerun the path search.
+
+Tuner.optimize runs an ask/tell Bayesian optimization that keeps one evaluation in
+flight per worker. New points are proposed with the constant liar strategy, pending
+points are told the lie (the best energy so far) until their result arrives.
+
+Expensive evaluations are scheduled with asynchronous successive halving: new points
+are evaluated with a fraction of their nsol, and only the best 1/halving_rate of a rung
+are promoted to the next, larger budget. The optimizer is told the energy of each point
+at the largest budget it has reached.
+
+The evaluations don't permute the scaffold sequence, like the final autobreak run of
+the GUIs, so a single sequence offset is solved and npermute is passed unchanged.
+"""
+
+import multiprocessing
+import time
+
+import numpy as np
+
+import utilities
+
+# Prepared designs of the worker process, keyed by (design hash, rule)
+WORKER_DESIGNS = {}
+
+
+def safe_convert(param, dtype):
+    """Convert a tuner parameter value"""
+    return dtype(param[0] if isinstance(param, np.ndarray) else param)
+
+
+def get_autobreak_params(params, budget=1.0):
+    """Convert tuner parameters to autobreak evaluation parameters"""
+    # Scale the number of solutions with the budget
+    nsol = safe_convert(params["nsol"], int)
+
+    return {
+        "rule": "xstap.all%d" % safe_convert(params["rule_x"], int),
+        "func": "dG:50",
+        "score": "sum",
+        "nsol": max(1, int(round(budget * nsol))),
+        "npermute": safe_convert(params["npermute"], int),
+        "minlength": safe_convert(params["minlength"], int),
+        "maxlength": safe_convert(params["maxlength"], int),
+        "dontbreak": safe_convert(params["dontbreak"], int),
+        "seed": safe_convert(params["seed"], int),
+    }
+
+
+def init_worker():
+    """Import the autobreak modules once per worker process"""
+    import autobreak_main  # Deferred import
+
+
+def get_worker_design(design_hash, input_filename, sequence_filename, rule):
+    """Get a prepared design of the worker process, prepare it on first use"""
+    from autobreak_main import prepare_design  # Deferred import
+
+    key = (design_hash, rule)
+    if key not in WORKER_DESIGNS:
+        WORKER_DESIGNS[key] = prepare_design(input_filename, sequence_filename, rule)
+
+    return WORKER_DESIGNS[key]
+
+
+def evaluate_worker(task):
+    """Evaluate tuner parameters in a worker process"""
+    from autobreak_main import evaluate  # Deferred import
+
+    design_hash, input_filename, sequence_filename, params, budget = task
+    autobreak_params = get_autobreak_params(params, budget)
+
+    # Get the prepared design for the break rule
+    origami = get_worker_design(
+        design_hash, input_filename, sequence_filename, autobreak_params["rule"]
+    )
+
+    return evaluate(origami, autobreak_params)
+
+
+class Tuner:
+    def __init__(self, input_filename, sequence_filename=None, num_workers=1):
+        """Parameter tuner evaluation pool"""
+        self.input_filename = input_filename
+        self.sequence_filename = sequence_filename
+        self.num_workers = num_workers
+
+        # Design hash of the input and sequence files
+        self.design_hash = utilities.get_files_hash(input_filename, sequence_filename)
+
+        # Evaluation timeout in seconds
+        self.timeout = 3600
+
+        # Successive halving parameters, a single rung disables early stopping. Two
+        # rungs keep the first rung nsol at a third of the tuned nsol.
+        self.halving_rate = 3
+        self.num_rungs = 2
+
+        # Worker pool
+        self.pool = None
+
+        # Timings of the last evaluation
+        self.timings = None
+
+    def start(self):
+        """Start the worker pool"""
+        if self.pool is not None:
+            return
+
+        # Spawn the workers, forking a process with GUI threads is not safe
+        context = multiprocessing.get_context("spawn")
+        self.pool = context.Pool(self.num_workers, initializer=init_worker)
+
+    def close(self):
+        """Stop the worker pool"""
+        if self.pool is None:
+            return
+
+        self.pool.terminate()
+        self.pool.join()
+        self.pool = None
+
+    def submit(self, params, budget=1.0):
+        """Submit tuner parameters to the worker pool"""
+        self.start()
+
+        task = (
+            self.design_hash,
+            self.input_filename,
+            self.sequence_filename,
+            params,
+            budget,
+        )
+        return self.pool.apply_async(evaluate_worker, (task,))
+
+    def restart(self, pending, param_names):
+        """Replace the worker pool and resubmit the evaluations in flight"""
+        self.close()
+
+        resubmitted = []
+        for point, rung, index, async_result, submit_time in pending:
+            params = dict(zip(param_names, point))
+            async_result = self.submit(params, self.get_rung_budget(rung))
+            resubmitted.append((point, rung, index, async_result, time.time()))
+
+        return resubmitted
+
+    def evaluate(self, params):
+        """Evaluate tuner parameters, return the energy, run time and parameters"""
+        start_time = time.time()
+        try:
+            energy, timings = self.submit(params).get(self.timeout)
+        except multiprocessing.TimeoutError:
+            # The worker is still busy, replace the pool
+            self.close()
+            return None, self.timeout, params
+
+        self.timings = timings
+        return energy, time.time() - start_time, params
+
+    def ask_points(self, optimizer, pending_points, num_points):
+        """Ask new points, the pending points are told the constant liar value"""
+        if pending_points and optimizer.yi:
+            optimizer = optimizer.copy(random_state=optimizer.rng)
+            optimizer.tell(pending_points, [min(optimizer.yi)] * len(pending_points))
+
+        return optimizer.ask(n_points=num_points, strategy="cl_min")
+
+    def get_rung_budget(self, rung):
+        """Get the budget fraction of a successive halving rung"""
+        return float(self.halving_rate) ** (rung - self.num_rungs + 1)
+
+    def tell_results(self, space, n_initial_points, random_state, points, energies):
+        """Create an optimizer told the energies of the evaluated points"""
+        from skopt import Optimizer  # Deferred import
+
+        optimizer = Optimizer(
+            space, "GP", n_initial_points=n_initial_points, random_state=random_state
+        )
+        result = optimizer.tell(points, energies)
+
+        return optimizer, result
+
+    def get_promotion(self, rung_results, promoted):
+        """Get a point in the top 1/halving_rate of a rung that can be promoted"""
+        for rung in range(self.num_rungs - 2, -1, -1):
+            num_top = len(rung_results[rung]) // self.halving_rate
+            top_results = sorted(rung_results[rung], key=lambda entry: entry[0])
+            for energy, index in top_results[:num_top]:
+                if index not in promoted[rung]:
+                    promoted[rung].add(index)
+                    return index, rung + 1
+
+        return None, None
+
+    def optimize(
+        self, space, n_calls=50, n_initial_points=10, callback=None, should_stop=None
+    ):
+        """
+        Minimize the energy over the search space with the worker pool
+
+        n_calls new points are evaluated at the first rung budget and passed to the
+        callback as they finish. A timed out evaluation replaces the pool, the other
+        evaluations in flight are resubmitted. Free workers promote points to larger
+        budgets before new points are asked. Each point is told with its energy at the
+        largest budget it has reached, the optimizer is recreated from the evaluated
+        points when their energies change.
+
+        If should_stop returns True no new evaluations are started, the evaluations in
+        flight are dropped and the result of the finished evaluations is returned.
+        """
+        from skopt import Optimizer  # Deferred import
+
+        self.start()
+
+        random_state = np.random.RandomState()
+        optimizer = Optimizer(
+            space, "GP", n_initial_points=n_initial_points, random_state=random_state
+        )
+        param_names = [dimension.name for dimension in space]
+
+        # Evaluated points and their energies at the largest budget, by point index
+        points = []
+        energies = []
+
+        # Evaluations in flight as (point, rung, point index, async result, submit
+        # time), new points get their index when they finish
+        pending = []
+
+        # Finished (energy, point index) results and promoted indices of each rung
+        rung_results = [[] for rung in range(self.num_rungs)]
+        promoted = [set() for rung in range(self.num_rungs)]
+
+        result = None
+
+        while True:
+            if should_stop is not None and should_stop():
+                break
+
+            # 1. Promote points to the free workers
+            while len(pending) < self.num_workers:
+                index, rung = self.get_promotion(rung_results, promoted)
+                if index is None:
+                    break
+                point = points[index]
+                params = dict(zip(param_names, point))
+                async_result = self.submit(params, self.get_rung_budget(rung))
+                pending.append((point, rung, index, async_result, time.time()))
+
+            # 2. Ask new points for the remaining free workers
+            pending_points = [
+                evaluation[0] for evaluation in pending if evaluation[1] == 0
+            ]
+            num_points = min(
+                self.num_workers - len(pending),
+                n_calls - len(points) - len(pending_points),
+            )
+            if num_points > 0:
+                for point in self.ask_points(optimizer, pending_points, num_points):
+                    params = dict(zip(param_names, point))
+                    async_result = self.submit(params, self.get_rung_budget(0))
+                    pending.append((point, 0, None, async_result, time.time()))
+
+            # Stop when there is nothing left to evaluate
+            if not pending:
+                break
+
+            # 3. Collect the finished evaluations
+            finished = []
+            timed_out = False
+            for evaluation in pending:
+                async_result, submit_time = evaluation[3:]
+                if async_result.ready():
+                    try:
+                        energy, timings = async_result.get()
+                    except Exception:
+                        energy = None
+                    finished.append((evaluation, energy))
+                elif time.time() - submit_time > self.timeout:
+                    finished.append((evaluation, None))
+                    timed_out = True
+
+            if not finished:
+                time.sleep(0.05)
+                continue
+
+            # 4. Store the results, a promoted result replaces the energy of its point
+            num_new = 0
+            for evaluation, energy in finished:
+                pending.remove(evaluation)
+                point, rung, index = evaluation[:3]
+                energy = energy if energy is not None and np.isfinite(energy) else 1e10
+
+                if rung == 0:
+                    index = len(points)
+                    points.append(point)
+                    energies.append(energy)
+                    num_new += 1
+                else:
+                    energies[index] = energy
+
+                rung_results[rung].append((energy, index))
+
+            # 5. Tell the optimizer the energies of all evaluated points
+            optimizer, result = self.tell_results(
+                space, n_initial_points, random_state, points, energies
+            )
+
+            if callback and num_new:
+                callback(result)
+
+            # A timed out worker is still busy, replace the pool and resubmit the
+            # evaluations in flight
+            if timed_out:
+                pending = self.restart(pending, param_names)
+
+        # Drop the evaluations in flight
+        if pending:
+            self.close()
+
+        return result
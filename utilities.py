@@ -1,5 +1,6 @@
 import numpy as np
 import logging
+import heapq
 
 # Units are in kcal/mol for Enthalpy and [cal/mol•°Kelvin]
 
@@ -364,6 +365,250 @@ def sequence_to_dG_dH_dS(sequence, temperature_kelvin=323.15):
     return (dGtotal, dHtotal, dStotal)
 
 
+# VECTORIZED NEAREST-NEIGHBOR ENGINE
+
+# Base encoding for the vectorized engine: A=0, C=1, G=2, T=3, anything else=4 (invalid)
+NN_INVALID_BASE = 4
+NN_BASE_CODES = np.full(256, NN_INVALID_BASE, dtype=np.uint8)
+for _code, _base in enumerate("ACGT"):
+    NN_BASE_CODES[ord(_base)] = _code
+
+# 16-entry dinucleotide tables indexed by 4*code(first base) + code(second base)
+NN_dH_ARRAY = np.array(
+    [SantaLucia2004Table1["dH"][a + b] for a in "ACGT" for b in "ACGT"]
+)
+NN_dS_ARRAY = np.array(
+    [SantaLucia2004Table1["dS"][a + b] for a in "ACGT" for b in "ACGT"]
+)
+
+# Same tables in exact integer units of 0.1 for prefix sums
+NN_dH_TENTHS = np.rint(10 * NN_dH_ARRAY).astype(np.int64)
+NN_dS_TENTHS = np.rint(10 * NN_dS_ARRAY).astype(np.int64)
+
+
+def encode_sequence(sequence):
+    """Encode a DNA sequence as a uint8 array (A=0, C=1, G=2, T=3, invalid=4)"""
+    return NN_BASE_CODES[
+        np.frombuffer(sequence.encode("ascii", "replace"), dtype=np.uint8)
+    ]
+
+
+def is_AT_code(codes):
+    """Return mask of A/T bases for encoded bases"""
+    return (codes == 0) | (codes == 3)
+
+
+def is_GC_code(codes):
+    """Return mask of G/C bases for encoded bases"""
+    return (codes == 1) | (codes == 2)
+
+
+def get_NN_terms_batch(sequences):
+    """
+    Evaluate SantaLucia 2004 ∆H and ∆S for a batch of sequences in one call
+
+    Returns dH [kcal/mol], dS [cal/mol•°K], sequence lengths and G/C counts as arrays.
+    Same conventions as get_dH_SantaLucia2004/get_dS_SantaLucia2004: sequences with
+    an invalid dinucleotide get dH = dS = 0. Empty sequences also get dH = dS = 0.
+    """
+    num_sequences = len(sequences)
+    seq_lengths = np.fromiter(
+        (len(sequence) for sequence in sequences), dtype=np.int64, count=num_sequences
+    )
+
+    # Encode all the sequences into a single array
+    codes = encode_sequence("".join(sequences))
+
+    # Sequence id for each base and start/final index for each sequence
+    seq_ids = np.repeat(np.arange(num_sequences), seq_lengths)
+    seq_ends = np.cumsum(seq_lengths)
+    seq_starts = seq_ends - seq_lengths
+
+    # Dinucleotides that stay inside a single valid sequence
+    pair_ids = seq_ids[:-1]
+    pair_mask = (pair_ids == seq_ids[1:]) & (codes[:-1] < 4) & (codes[1:] < 4)
+    pair_index = 4 * codes[:-1][pair_mask].astype(np.int64) + codes[1:][pair_mask]
+
+    # Nearest-neighbor sums per sequence
+    dH_NN = np.bincount(
+        pair_ids[pair_mask], weights=NN_dH_ARRAY[pair_index], minlength=num_sequences
+    )
+    dS_NN = np.bincount(
+        pair_ids[pair_mask], weights=NN_dS_ARRAY[pair_index], minlength=num_sequences
+    )
+
+    # Invalid base and GC counts per sequence
+    num_invalid = np.bincount(
+        seq_ids, weights=codes == NN_INVALID_BASE, minlength=num_sequences
+    )
+    gc_counts = np.bincount(
+        seq_ids, weights=is_GC_code(codes), minlength=num_sequences
+    ).astype(np.int64)
+
+    # Terminal AT counts (first char, and last char for sequences longer than 1)
+    non_empty = seq_lengths > 0
+    end_AT = np.zeros(num_sequences, dtype=np.int64)
+    end_AT[non_empty] += is_AT_code(codes[seq_starts[non_empty]])
+    is_long = seq_lengths > 1
+    end_AT[is_long] += is_AT_code(codes[seq_ends[is_long] - 1])
+
+    dH = get_NN_total_SantaLucia2004("dH", dH_NN, end_AT)
+    dS = get_NN_total_SantaLucia2004("dS", dS_NN, end_AT)
+
+    # Invalid and empty sequences
+    is_invalid = ((num_invalid > 0) & is_long) | ~non_empty
+    dH[is_invalid] = 0
+    dS[is_invalid] = 0
+
+    return dH, dS, seq_lengths, gc_counts
+
+
+def get_NN_total_SantaLucia2004(param, NN_sums, end_AT):
+    """Add initiation and terminal-AT terms to nearest-neighbor sums (dH or dS)"""
+    NN_table = SantaLucia2004Table1[param]
+    return (
+        NN_table["Initiation"] + NN_sums + end_AT * NN_table["Terminal-AT-Penalty"]
+    )
+
+
+def NN_terms_to_dG_dH_dS(dH, dS, seq_lengths, temperature_kelvin=323.15):
+    """Vectorized version of sequence_to_dG_dH_dS from precomputed NN terms"""
+    # Determine Dunn2015 salt correction
+    dSsalt = get_salt_corrected_dS_Dunn2015(seq_lengths)
+
+    # Get total entropy and dG at the specified temperature
+    dStotal = (dS + dSsalt) / 1000.0
+    dGtotal = dH - temperature_kelvin * dStotal
+
+    # Zero-length sequences
+    is_empty = seq_lengths == 0
+    dGtotal[is_empty] = 0
+    dStotal[is_empty] = 0
+
+    return (dGtotal, np.array(dH, dtype=float), dStotal)
+
+
+def NN_terms_to_Tm(dH, dS, gc_counts, seq_lengths, Mg_conc=Mg_CONC):
+    """Vectorized version of sequence_to_Tm from precomputed NN terms"""
+    # Equation from Santalucia paper
+    Tm_1M_NaCl = get_Tm_SantaLucia2004(dH, dS)
+
+    # Perform Owczarzy Mg++ correction for oligomers (same constants as scalar version)
+    a, b, c, d = 3.92e-5, -9.11e-6, 6.26e-5, 1.42e-5
+    e, f, g = -4.82e-4, 5.25e-4, 8.31e-5
+
+    is_long = seq_lengths > 1
+    safe_lengths = np.where(is_long, seq_lengths, 2)
+    fGC = 1.0 * gc_counts / safe_lengths
+    ln_Mg = np.log(Mg_conc)
+
+    Tm_Mg_inv = (
+        1.0 / Tm_1M_NaCl
+        + a
+        + b * ln_Mg
+        + fGC * (c + d * ln_Mg)
+        + 1.0 / (2 * (safe_lengths - 1)) * (e + f * ln_Mg + g * ln_Mg**2)
+    )
+    Tm = np.where(is_long, 1.0 / Tm_Mg_inv, Tm_1M_NaCl)
+
+    # Zero-length sequences have no Tm
+    Tm[seq_lengths == 0] = np.nan
+
+    return Tm
+
+
+def sequences_to_dG_dH_dS(sequences, temperature_kelvin=323.15):
+    """Batch version of sequence_to_dG_dH_dS, returns (dG, dH, dS) arrays"""
+    dH, dS, seq_lengths, _ = get_NN_terms_batch(sequences)
+    return NN_terms_to_dG_dH_dS(dH, dS, seq_lengths, temperature_kelvin)
+
+
+def sequences_to_Tm(sequences):
+    """Batch version of sequence_to_Tm, zero-length sequences return nan"""
+    dH, dS, seq_lengths, gc_counts = get_NN_terms_batch(sequences)
+    return NN_terms_to_Tm(dH, dS, gc_counts, seq_lengths)
+
+
+class SequenceThermoIndex:
+    def __init__(self, sequence, circular=True):
+        """
+        Prefix-sum nearest-neighbor index over a (typically circular) scaffold sequence
+
+        Any window of the sequence gets its ∆H/∆S nearest-neighbor sums, G/C count and
+        terminal-AT correction in O(1) from the endpoints. Positions are 1-based like
+        the scaffold positions in Origami.key2scaffold. Since the SantaLucia table is
+        symmetric under reverse complement, a staple segment gets the same values as
+        the scaffold window it hybridizes to.
+        """
+        self.sequence = sequence
+        self.length = len(sequence)
+        self.circular = circular
+
+        # Encode sequence and get the next base for every base (last one wraps around)
+        self.codes = encode_sequence(sequence)
+        next_codes = np.roll(self.codes, -1)
+
+        # Dinucleotide terms in exact integer units of 0.1 kcal/mol and 0.1 cal/mol•°K
+        pair_valid = (self.codes < 4) & (next_codes < 4)
+        pair_index = np.where(
+            pair_valid, 4 * self.codes.astype(np.int64) + next_codes, 0
+        )
+        dH_pairs = np.where(pair_valid, NN_dH_TENTHS[pair_index], 0)
+        dS_pairs = np.where(pair_valid, NN_dS_TENTHS[pair_index], 0)
+
+        # Cumulative sums over the doubled sequence so that windows crossing
+        # the origin of a circular sequence are contiguous
+        self.dH_cumsum = self._doubled_cumsum(dH_pairs)
+        self.dS_cumsum = self._doubled_cumsum(dS_pairs)
+        self.invalid_cumsum = self._doubled_cumsum(~pair_valid)
+        self.gc_cumsum = self._doubled_cumsum(is_GC_code(self.codes))
+
+    def _doubled_cumsum(self, values):
+        """Cumulative sum with a leading zero over two copies of values"""
+        cumsum = np.zeros(2 * self.length + 1, dtype=np.int64)
+        np.cumsum(np.tile(values.astype(np.int64), 2), out=cumsum[1:])
+        return cumsum
+
+    def get_window_lengths(self, start_positions, final_positions):
+        """Get window lengths between start and final positions (inclusive)"""
+        start_positions = np.asarray(start_positions, dtype=np.int64)
+        final_positions = np.asarray(final_positions, dtype=np.int64)
+        if self.circular:
+            return (final_positions - start_positions) % self.length + 1
+        else:
+            return final_positions - start_positions + 1
+
+    def get_NN_terms(self, start_positions, seq_lengths):
+        """Same output as get_NN_terms_batch for windows given by start and length"""
+        starts = (np.asarray(start_positions, dtype=np.int64) - 1) % self.length
+        seq_lengths = np.asarray(seq_lengths, dtype=np.int64)
+
+        # Dinucleotides of a window run from start to start + length - 2
+        pair_finals = starts + np.maximum(seq_lengths - 1, 0)
+        dH_NN = (self.dH_cumsum[pair_finals] - self.dH_cumsum[starts]) / 10.0
+        dS_NN = (self.dS_cumsum[pair_finals] - self.dS_cumsum[starts]) / 10.0
+        num_invalid = self.invalid_cumsum[pair_finals] - self.invalid_cumsum[starts]
+        gc_counts = self.gc_cumsum[starts + seq_lengths] - self.gc_cumsum[starts]
+
+        # Terminal AT counts from the endpoints only
+        non_empty = seq_lengths > 0
+        is_long = seq_lengths > 1
+        end_AT = non_empty * is_AT_code(self.codes[starts]).astype(np.int64)
+        end_AT += is_long * is_AT_code(
+            self.codes[(starts + seq_lengths - 1) % self.length]
+        )
+
+        dH = get_NN_total_SantaLucia2004("dH", dH_NN, end_AT)
+        dS = get_NN_total_SantaLucia2004("dS", dS_NN, end_AT)
+
+        # Invalid and empty windows
+        is_invalid = ((num_invalid > 0) & is_long) | ~non_empty
+        dH[is_invalid] = 0
+        dS[is_invalid] = 0
+
+        return dH, dS, seq_lengths, gc_counts
+
+
 # SEQUENCE GENERATORS
 
 
@@ -437,6 +682,92 @@ def zip_directory(input_dir_path, output_zip_path):
                 zipf.write(file_path, arcname)
 
 
+# HEATMAP COLORS
+
+# Folding temperature colors as (rgb, hex color), keyed by (min Tf, max Tf)
+TF_COLORS = {}
+
+
+def get_Tf_color(Tf, min_Tf=30, max_Tf=70):
+    """
+    Get the reversed coolwarm color of a folding temperature.
+
+    :param Tf: Folding temperature, clipped to [min_Tf, max_Tf].
+    :returns: (rgb, hex color), the color table is made once per Tf range.
+    """
+    if (min_Tf, max_Tf) not in TF_COLORS:
+        import matplotlib.colors  # Deferred import
+        from matplotlib import colormaps  # Deferred import
+
+        cmap = colormaps["coolwarm"].resampled(max_Tf - min_Tf + 1).reversed()
+        TF_COLORS[(min_Tf, max_Tf)] = [
+            (cmap(index)[:3], matplotlib.colors.rgb2hex(cmap(index)[:3]))
+            for index in range(max_Tf - min_Tf + 1)
+        ]
+
+    # Get color index
+    if Tf <= min_Tf:
+        cmap_index = 0
+    elif Tf >= max_Tf:
+        cmap_index = max_Tf - min_Tf
+    else:
+        cmap_index = int(Tf - min_Tf)
+
+    return TF_COLORS[(min_Tf, max_Tf)][cmap_index]
+
+
+# FILE HASHING
+def get_files_hash(*filenames):
+    """
+    Get a content hash of the files.
+
+    :param filenames: File paths, None or missing files contribute their name only.
+    """
+    import hashlib, os
+
+    files_hash = hashlib.sha1()
+    for filename in filenames:
+        if filename and os.path.isfile(filename):
+            with open(filename, "rb") as input_file:
+                content = input_file.read()
+        else:
+            content = str(filename).encode()
+
+        # Prefix the content length to keep the file boundaries
+        files_hash.update(b"%d:" % len(content))
+        files_hash.update(content)
+
+    return files_hash.hexdigest()
+
+
+# PATH SEARCH
+def select_k_best_entries(path_entries, k_num, constraint_bits=0):
+    """
+    Select the k-best path entries by score.
+
+    :param path_entries: (score, path bitset, ...) entries arriving at a break node.
+    :param k_num: Number of entries to keep.
+    :param constraint_bits: Bits of the breaks that later neighbor constraints can
+        discard. k entries are kept for each subset of these bits on the paths, so
+        the constraints can't remove all the kept entries of a better path.
+    """
+    if not constraint_bits:
+        return heapq.nlargest(k_num, path_entries, key=lambda x: x[0])
+
+    # Group the entries by the constrained breaks on their paths
+    entry_groups = {}
+    for path_entry in path_entries:
+        constrained_bits = path_entry[1] & constraint_bits
+        entry_groups.setdefault(constrained_bits, []).append(path_entry)
+
+    best_entries = []
+    for group_entries in entry_groups.values():
+        best_entries.extend(heapq.nlargest(k_num, group_entries, key=lambda x: x[0]))
+    best_entries.sort(key=lambda x: x[0], reverse=True)
+
+    return best_entries
+
+
 # def svg_to_jpg(self, svg_file_path, jpg_file_path, quality=95):
 #     logging.info(f"Converting {svg_file_path} to {jpg_file_path}")
 #     png_file_path = jpg_file_path.replace(".jpg", ".png")